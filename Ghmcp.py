@@ -1,12 +1,31 @@
-from pydantic import BaseModel, Field, ValidationError
-from typing import Dict, List, Optional, Any, Union
+from pydantic import BaseModel, Field, PrivateAttr, ValidationError
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Any, Tuple, Union
+import argparse
 import copy
+import hashlib
 import json
+import sys
+import threading
+import time
+
+try:
+    import orjson  # Backend JSON opcional, bem mais rápido que o json da biblioteca padrão
+except ImportError:
+    orjson = None
+
+
+# Palavras-chave de composição e de definições locais percorridas no enriquecimento
+_COMPOSITION_KEYWORDS = ('anyOf', 'oneOf', 'allOf')
+_DEFINITIONS_KEYWORDS = ('$defs', 'definitions')
 
 
 class PropertySchema(BaseModel):
     """Modelo para propriedades do schema"""
-    type: str
+    type: Optional[str] = None  # Ausente em nós só com $ref/anyOf/oneOf/allOf
     description: Optional[str] = None
     enum: Optional[List[str]] = None
     items: Optional[Any] = None
@@ -25,6 +44,9 @@ class ParametersSchema(BaseModel):
     required: List[str] = []
     properties: Dict[str, PropertySchema]
     additionalProperties: bool = Field(default=False)
+    # Definições ficam cruas: as que não validam como PropertySchema passam sem enriquecer
+    defs: Optional[Dict[str, Any]] = Field(default=None, alias='$defs')
+    definitions: Optional[Dict[str, Any]] = None
     
     def enrich_with_nullable(self) -> 'ParametersSchema':
         """Adiciona nullable: true para campos não obrigatórios"""
@@ -44,7 +66,9 @@ class ParametersSchema(BaseModel):
             type=self.type,
             required=self.required,
             properties=enriched_properties,
-            additionalProperties=self.additionalProperties
+            additionalProperties=self.additionalProperties,
+            definitions=self.definitions,
+            **{'$defs': self.defs}
         )
     
     def enrich_with_additional_properties(self) -> 'ParametersSchema':
@@ -74,8 +98,42 @@ class ParametersSchema(BaseModel):
                         PropertySchema(**prop_dict['items'])
                     )
             
+            # Processa os ramos de anyOf/oneOf/allOf
+            for keyword in _COMPOSITION_KEYWORDS:
+                if isinstance(prop_dict.get(keyword), list):
+                    prop_dict[keyword] = [enrich_subschema(branch) for branch in prop_dict[keyword]]
+            
+            # Processa definições locais ($defs/definitions) aninhadas
+            for keyword in _DEFINITIONS_KEYWORDS:
+                if isinstance(prop_dict.get(keyword), dict):
+                    prop_dict[keyword] = {
+                        def_name: enrich_subschema(definition)
+                        for def_name, definition in prop_dict[keyword].items()
+                    }
+            
             return PropertySchema(**prop_dict)
         
+        def enrich_subschema(node: Any) -> Any:
+            """
+            Enriquece um ramo de composição ou uma definição. Ramos que não
+            validam como PropertySchema (por exemplo, enum de inteiros) saem
+            como vieram, como antes de esses ramos serem percorridos.
+            """
+            if not isinstance(node, dict):
+                return node
+            try:
+                return enrich_recursive(PropertySchema(**node))
+            except ValidationError:
+                return node
+        
+        def enrich_definitions(
+            definitions: Optional[Dict[str, Any]]
+        ) -> Optional[Dict[str, Any]]:
+            """Enriquece cada definição uma única vez; os $ref continuam apontando para elas"""
+            if definitions is None:
+                return None
+            return {name: enrich_subschema(definition) for name, definition in definitions.items()}
+        
         # Enriquecer todas as propriedades
         enriched_properties = {}
         for prop_name, prop_schema in self.properties.items():
@@ -85,7 +143,9 @@ class ParametersSchema(BaseModel):
             type=self.type,
             required=self.required,
             properties=enriched_properties,
-            additionalProperties=self.additionalProperties
+            additionalProperties=self.additionalProperties,
+            definitions=enrich_definitions(self.definitions),
+            **{'$defs': enrich_definitions(self.defs)}
         )
 
 
@@ -110,12 +170,21 @@ class FunctionSchema(BaseModel):
             parameters=fully_enriched_params,
             strict=self.strict
         )
+    
+    def compile_validator(self) -> 'ArgumentValidator':
+        """
+        Compila (ou reaproveita do cache) o validador de argumentos desta função.
+        Deve ser chamado no schema já enriquecido, para que nullable e
+        additionalProperties sejam considerados.
+        """
+        return compile_validator(self.parameters.dict(exclude_none=True, by_alias=True))
 
 
 class FunctionCallSchema(BaseModel):
     """Modelo para o schema completo de chamada de função"""
     type: str = Field(default="function")
     function: FunctionSchema
+    _enriched_schema: Optional['EnrichedSchema'] = PrivateAttr(default=None)
     
     def enrich(self) -> 'FunctionCallSchema':
         """Aplica enriquecimento ao schema completo"""
@@ -125,7 +194,17 @@ class FunctionCallSchema(BaseModel):
     def to_enriched_dict(self) -> Dict[str, Any]:
         """Retorna o dicionário enriquecido"""
         enriched = self.enrich()
-        return enriched.dict(exclude_none=True)
+        return enriched.dict(exclude_none=True, by_alias=True)
+    
+    def to_enriched_schema(self) -> 'EnrichedSchema':
+        """
+        Retorna o dicionário enriquecido junto da sua forma serializada canônica.
+        O resultado é calculado uma vez e guardado no modelo, que não deve ser
+        alterado depois disso.
+        """
+        if self._enriched_schema is None:
+            self._enriched_schema = EnrichedSchema.from_dict(self.to_enriched_dict())
+        return self._enriched_schema
 
 
 # Funções utilitárias para processamento direto
@@ -133,78 +212,1041 @@ def enrich_json_schema(json_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Função principal que enriquece o JSON schema com ambos os enriquecimentos
     """
-    # Cria o modelo a partir do JSON
+    # Cria o modelo a partir do JSON e aplica os enriquecimentos; o
+    # enriquecimento também valida subschemas (items), então fica no mesmo try
     try:
         function_schema = FunctionCallSchema(**json_data)
+        enriched_schema = function_schema.enrich()
     except ValidationError as e:
         print(f"Erro de validação: {e}")
         return json_data
     
-    # Aplica os enriquecimentos
-    enriched_schema = function_schema.enrich()
-    
     # Retorna como dicionário
-    return enriched_schema.dict(exclude_none=True)
+    return enriched_schema.dict(exclude_none=True, by_alias=True)
+
+
+def _schema_children(node: Any) -> List[Any]:
+    """
+    Filhos percorridos pelo enriquecimento: properties de objetos, items de
+    arrays, ramos de anyOf/oneOf/allOf e definições locais ($defs/definitions)
+    """
+    if not isinstance(node, dict):
+        return []
+    children: List[Any] = []
+    node_type = node.get('type')
+    if node_type == 'object' and 'properties' in node:
+        properties = node['properties']
+        if isinstance(properties, dict):
+            children.extend(properties.values())
+    elif node_type == 'array' and 'items' in node:
+        children.append(node['items'])
+    for keyword in _COMPOSITION_KEYWORDS:
+        if isinstance(node.get(keyword), list):
+            children.extend(node[keyword])
+    for keyword in _DEFINITIONS_KEYWORDS:
+        if isinstance(node.get(keyword), dict):
+            children.extend(node[keyword].values())
+    return children
+
+
+def _rebuild_with_additional_properties(node: Any, done: Dict[int, Any]) -> Any:
+    """Reconstrói o nó a partir dos filhos já enriquecidos, reaproveitando-o se nada mudou"""
+    if not isinstance(node, dict):
+        return node
+    updates: Dict[str, Any] = {}
+    node_type = node.get('type')
+
+    if node_type == 'object' and 'properties' in node:
+        properties = node['properties']
+        if isinstance(properties, dict) and any(done[id(child)] is not child for child in properties.values()):
+            updates['properties'] = {name: done[id(child)] for name, child in properties.items()}
+        if 'additionalProperties' not in node:
+            updates['additionalProperties'] = False
+    elif node_type == 'array' and 'items' in node:
+        items = node['items']
+        if done[id(items)] is not items:
+            updates['items'] = done[id(items)]
+
+    for keyword in _COMPOSITION_KEYWORDS:
+        branches = node.get(keyword)
+        if isinstance(branches, list) and any(done[id(branch)] is not branch for branch in branches):
+            updates[keyword] = [done[id(branch)] for branch in branches]
+
+    for keyword in _DEFINITIONS_KEYWORDS:
+        definitions = node.get(keyword)
+        if isinstance(definitions, dict) and any(done[id(d)] is not d for d in definitions.values()):
+            updates[keyword] = {name: done[id(d)] for name, d in definitions.items()}
+
+    if not updates:
+        return node
+    result = node.copy()
+    result.update(updates)
+    return result
+
+
+def _add_additional_properties(root: Any) -> Any:
+    """
+    Adiciona additionalProperties: false a todos os objetos com uma pilha
+    explícita (pós-ordem), sem recursão em Python e sem alterar a entrada.
+    Subárvores que não mudam são devolvidas como estão, e cada nó é visitado
+    uma única vez, mesmo quando referenciado em mais de um lugar.
+    """
+    done: Dict[int, Any] = {}
+    in_progress = set()
+    stack: List[Tuple[Any, bool]] = [(root, False)]
+
+    while stack:
+        node, expanded = stack.pop()
+        key = id(node)
+        if key in done:
+            continue
+        if expanded:
+            in_progress.discard(key)
+            done[key] = _rebuild_with_additional_properties(node, done)
+            continue
+        if key in in_progress:
+            raise ValueError("Schema cíclico não pode ser enriquecido")
+        in_progress.add(key)
+        stack.append((node, True))
+        for child in _schema_children(node):
+            if id(child) not in done:
+                stack.append((child, False))
+
+    return done[id(root)]
 
 
 def enrich_json_schema_recursive(json_data: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Versão alternativa que processa recursivamente sem modelos Pydantic
+    Versão alternativa que processa sem modelos Pydantic.
+
+    Não altera a entrada: só os nós que mudam são copiados e o restante é
+    compartilhado com ela. Ramos de anyOf/oneOf/allOf e definições em
+    $defs/definitions também são enriquecidos; os $ref são mantidos, e cada
+    definição é enriquecida uma única vez, no lugar onde é declarada, o que
+    torna seguras as referências recursivas. A travessia é iterativa, então schemas com
+    milhares de níveis de aninhamento não esbarram no limite de recursão.
     """
-    def add_nullable(schema: Dict[str, Any]) -> Dict[str, Any]:
-        """Adiciona nullable: true a campos não obrigatórios"""
-        if not isinstance(schema, dict):
-            return schema
-        
-        result = schema.copy()
-        
-        # Verifica se é um objeto com properties e required
-        if (result.get('type') == 'object' and 
-            'properties' in result and 
-            'required' in result):
-            
-            required_fields = result['required']
-            properties = result['properties']
-            
-            for field_name, field_props in properties.items():
-                if field_name not in required_fields:
-                    if isinstance(field_props, dict):
-                        field_props['nullable'] = True
-        
-        return result
-    
-    def add_additional_properties(schema: Dict[str, Any]) -> Dict[str, Any]:
-        """Adiciona additionalProperties: false a todos os objetos"""
-        if not isinstance(schema, dict):
-            return schema
-        
-        result = schema.copy()
-        
-        # Se for um objeto com properties, adiciona additionalProperties
-        if result.get('type') == 'object' and 'properties' in result:
-            if 'additionalProperties' not in result:
-                result['additionalProperties'] = False
-            
-            # Processa propriedades recursivamente
-            if 'properties' in result:
-                for prop_name, prop_schema in result['properties'].items():
-                    result['properties'][prop_name] = add_additional_properties(prop_schema)
-        
-        # Processa items em arrays
-        if result.get('type') == 'array' and 'items' in result:
-            result['items'] = add_additional_properties(result['items'])
-        
-        return result
-    
-    # Aplica os enriquecimentos em sequência
-    with_nullable = add_nullable(json_data)
-    fully_enriched = add_additional_properties(with_nullable)
-    
+    if not isinstance(json_data, dict):
+        return json_data
+
+    fully_enriched = _add_additional_properties(json_data)
+
+    # nullable: true nos campos não obrigatórios do objeto raiz
+    if (json_data.get('type') == 'object' and
+        'properties' in json_data and
+        'required' in json_data):
+
+        required_fields = json_data['required']
+        properties = fully_enriched['properties']
+        enriched_properties = None
+
+        for field_name, field_props in properties.items():
+            if (field_name not in required_fields and
+                    isinstance(field_props, dict) and
+                    field_props.get('nullable') is not True):
+                if enriched_properties is None:
+                    enriched_properties = properties.copy()
+                enriched_properties[field_name] = {**field_props, 'nullable': True}
+
+        if enriched_properties is not None:
+            if fully_enriched is json_data:
+                fully_enriched = json_data.copy()
+            fully_enriched['properties'] = enriched_properties
+
     return fully_enriched
 
 
+class _FallbackToPydantic(Exception):
+    """Sinaliza que a entrada foge do caminho rápido e deve ser tratada pelo Pydantic"""
+
+
+_PROPERTY_STR_FIELDS = frozenset(('type', 'description'))
+_PROPERTY_STR_LIST_FIELDS = frozenset(('enum', 'required'))
+_PROPERTY_BOOL_FIELDS = frozenset(('additionalProperties', 'nullable'))
+
+
+def _is_str_list(value: Any) -> bool:
+    return type(value) is list and all(type(item) is str for item in value)
+
+
+def _previous_entry(previous: Optional[Tuple[Any, Any]], key: str, index: Any = None) -> Optional[Tuple[Any, Any]]:
+    """Par (entrada, saída) anterior do filho key[index], se existir nos dois lados"""
+    if previous is None:
+        return None
+    old_node, old_result = previous
+    try:
+        old_value, old_out = old_node[key], old_result[key]
+        if index is not None:
+            old_value, old_out = old_value[index], old_out[index]
+    except (KeyError, IndexError, TypeError):
+        return None
+    return old_value, old_out
+
+
+def _compile_property(
+    node: Any, enrich: bool, previous: Optional[Tuple[Any, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Equivalente a PropertySchema(**node).dict(exclude_none=True) e, quando
+    enrich=True, ao enrich_recursive de enrich_with_additional_properties,
+    em uma única passada e sem instanciar modelos.
+
+    previous é o par (entrada, saída) de um enriquecimento anterior do mesmo
+    nó: subárvores iguais às anteriores reaproveitam a saída já calculada.
+    """
+    if previous is not None:
+        old_node, old_result = previous
+        if node is old_node or node == old_node:
+            return old_result
+        # Mudança de tipo altera o que é enriquecido abaixo do nó: recomeça do zero
+        if (type(old_node) is not dict or type(old_result) is not dict or
+                type(node) is not dict or node.get('type') != old_node.get('type')):
+            previous = None
+
+    if type(node) is not dict:
+        raise _FallbackToPydantic
+    node_type = node.get('type')
+    if node_type is not None and type(node_type) is not str:
+        raise _FallbackToPydantic
+
+    # Só objetos propagam o enriquecimento para properties e só arrays para items
+    enrich_properties = enrich and node_type == 'object'
+    enrich_items = enrich and node_type == 'array'
+
+    result = {}
+    for key, value in node.items():
+        if value is None:
+            continue
+        if key == 'properties':
+            if type(value) is not dict:
+                raise _FallbackToPydantic
+            sub_properties = {}
+            for sub_name, sub_prop in value.items():
+                if type(sub_name) is not str:
+                    raise _FallbackToPydantic
+                sub_properties[sub_name] = _compile_property(
+                    sub_prop, enrich_properties, _previous_entry(previous, key, sub_name)
+                )
+            value = sub_properties
+        elif key == 'items':
+            # items é Any no modelo: só é validado quando o array é enriquecido
+            if enrich_items and isinstance(value, dict):
+                value = _compile_property(value, True, _previous_entry(previous, key))
+        elif enrich and key in _COMPOSITION_KEYWORDS:
+            # Fora do enriquecimento são extras e saem como vieram
+            if isinstance(value, list):
+                value = [
+                    _compile_property(branch, True, _previous_entry(previous, key, index))
+                    if isinstance(branch, dict) else branch
+                    for index, branch in enumerate(value)
+                ]
+        elif enrich and key in _DEFINITIONS_KEYWORDS:
+            if isinstance(value, dict):
+                value = {
+                    def_name: _compile_property(definition, True, _previous_entry(previous, key, def_name))
+                    if isinstance(definition, dict) else definition
+                    for def_name, definition in value.items()
+                }
+        elif key in _PROPERTY_STR_FIELDS:
+            if type(value) is not str:
+                raise _FallbackToPydantic
+        elif key in _PROPERTY_STR_LIST_FIELDS:
+            if not _is_str_list(value):
+                raise _FallbackToPydantic
+        elif key in _PROPERTY_BOOL_FIELDS:
+            if type(value) is not bool:
+                raise _FallbackToPydantic
+        result[key] = value
+
+    if enrich_properties and 'properties' in result and 'additionalProperties' not in result:
+        result['additionalProperties'] = False
+
+    return result
+
+
+def _compile_function_call(
+    json_data: Any, previous: Optional[Tuple[Any, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Aplica nullable e additionalProperties ao schema completo em uma única travessia.
+    previous é o par (entrada, saída) de um enriquecimento anterior, cujas
+    subárvores inalteradas são reaproveitadas.
+    """
+    if type(json_data) is not dict:
+        raise _FallbackToPydantic
+    call_type = json_data.get('type', 'function')
+    function = json_data.get('function')
+    if type(call_type) is not str or type(function) is not dict:
+        raise _FallbackToPydantic
+
+    name = function.get('name')
+    description = function.get('description')
+    strict = function.get('strict', False)
+    parameters = function.get('parameters')
+    if (type(name) is not str or type(description) is not str or
+            type(strict) is not bool or type(parameters) is not dict):
+        raise _FallbackToPydantic
+
+    params_type = parameters.get('type', 'object')
+    required = parameters.get('required', [])
+    properties = parameters.get('properties')
+    additional_properties = parameters.get('additionalProperties', False)
+    if (type(params_type) is not str or not _is_str_list(required) or
+            type(properties) is not dict or type(additional_properties) is not bool):
+        raise _FallbackToPydantic
+
+    previous_parameters = _previous_entry(_previous_entry(previous, 'function'), 'parameters')
+    previous_required = None
+    if previous_parameters is not None:
+        old_required = previous_parameters[0].get('required', [])
+        previous_required = set(old_required) if isinstance(old_required, list) else None
+
+    required_fields = set(required)
+    enriched_properties = {}
+    for prop_name, prop_schema in properties.items():
+        if type(prop_name) is not str:
+            raise _FallbackToPydantic
+        # A saída anterior só serve se o campo não mudou de obrigatoriedade (nullable)
+        previous_prop = None
+        if previous_required is not None and (
+                (prop_name in previous_required) == (prop_name in required_fields)):
+            previous_prop = _previous_entry(_previous_entry(previous_parameters, 'properties'), prop_name)
+        enriched = _compile_property(prop_schema, True, previous_prop)
+        if prop_name not in required_fields and enriched.get('nullable') is not True:
+            enriched['nullable'] = True
+        enriched_properties[prop_name] = enriched
+
+    compiled_parameters = {
+        'type': params_type,
+        'required': required,
+        'properties': enriched_properties,
+        'additionalProperties': additional_properties,
+    }
+    for keyword in _DEFINITIONS_KEYWORDS:
+        definitions = parameters.get(keyword)
+        if definitions is None:
+            continue
+        if type(definitions) is not dict:
+            raise _FallbackToPydantic
+        compiled_definitions = {}
+        for def_name, definition in definitions.items():
+            if type(def_name) is not str:
+                raise _FallbackToPydantic
+            compiled_definitions[def_name] = _compile_property(
+                definition, True, _previous_entry(_previous_entry(previous_parameters, keyword), def_name)
+            )
+        compiled_parameters[keyword] = compiled_definitions
+
+    return {
+        'type': call_type,
+        'function': {
+            'name': name,
+            'description': description,
+            'parameters': compiled_parameters,
+            'strict': strict,
+        },
+    }
+
+
+# Saídas recentes de compilações bem-sucedidas do caminho rápido, por id. A
+# referência forte mantém o objeto vivo e impede que o id seja reaproveitado.
+_COMPILED_OUTPUTS_MAXSIZE = 256
+_compiled_outputs: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+_compiled_outputs_lock = threading.Lock()
+
+
+def _remember_compiled(output: Dict[str, Any]) -> Dict[str, Any]:
+    with _compiled_outputs_lock:
+        _compiled_outputs[id(output)] = output
+        _compiled_outputs.move_to_end(id(output))
+        while len(_compiled_outputs) > _COMPILED_OUTPUTS_MAXSIZE:
+            _compiled_outputs.popitem(last=False)
+    return output
+
+
+def _is_compiled(output: Any) -> bool:
+    with _compiled_outputs_lock:
+        return _compiled_outputs.get(id(output)) is output
+
+
+def enrich_json_schema_fast(json_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Versão de passada única de enrich_json_schema, com o mesmo resultado.
+
+    Percorre o schema uma vez aplicando nullable e additionalProperties, sem
+    construir modelos Pydantic intermediários. Valores que não são alterados
+    (strings, listas de enum/required, extras) são compartilhados com a entrada.
+    Entradas fora do formato esperado são delegadas a enrich_json_schema, que
+    continua sendo a referência de validação.
+    """
+    try:
+        return _remember_compiled(_compile_function_call(json_data))
+    except _FallbackToPydantic:
+        return enrich_json_schema(json_data)
+
+
+def enrich_json_schema_incremental(
+    previous_input: Dict[str, Any],
+    previous_output: Dict[str, Any],
+    new_input: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Reenriquece new_input aproveitando um enriquecimento anterior.
+
+    Compara a nova entrada com previous_input nó a nó e só recalcula as
+    subárvores que mudaram; as demais são reaproveitadas de previous_output
+    (e passam a ser compartilhadas com ele, não devem ser alteradas). A
+    comparação é por identidade antes de igualdade, então entradas que
+    compartilham as partes inalteradas com a anterior custam proporcionalmente
+    ao tamanho da mudança. O resultado é o mesmo de enrich_json_schema.
+
+    Só há reaproveitamento quando previous_output saiu de uma compilação
+    recente do caminho rápido (enrich_json_schema_fast ou desta função). Uma
+    saída do Pydantic pode conter ramos inválidos repassados como vieram, que
+    não podem ser reaproveitados como se tivessem sido validados: nesse caso
+    new_input é enriquecido do zero.
+    """
+    if not _is_compiled(previous_output):
+        return enrich_json_schema_fast(new_input)
+    if new_input is previous_input or new_input == previous_input:
+        return previous_output
+    try:
+        return _remember_compiled(_compile_function_call(new_input, (previous_input, previous_output)))
+    except _FallbackToPydantic:
+        return enrich_json_schema(new_input)
+
+
+def _enrich_pydantic_or_raise(json_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Como enrich_json_schema, mas propaga o erro de validação em vez de imprimi-lo"""
+    return FunctionCallSchema(**json_data).enrich().dict(exclude_none=True, by_alias=True)
+
+
+def _enrich_or_raise(json_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Como enrich_json_schema_fast, mas propaga o erro de validação em vez de imprimi-lo"""
+    try:
+        return _compile_function_call(json_data)
+    except _FallbackToPydantic:
+        return _enrich_pydantic_or_raise(json_data)
+
+
+def _copy_json(value: Any) -> Any:
+    """Cópia profunda restrita a dict/list, bem mais barata que copy.deepcopy para JSON"""
+    if type(value) is dict:
+        return {key: _copy_json(item) for key, item in value.items()}
+    if type(value) is list:
+        return [_copy_json(item) for item in value]
+    return value
+
+
+def canonical_json_bytes(json_data: Any) -> bytes:
+    """JSON canônico (chaves ordenadas, compacto, UTF-8), via orjson quando instalado"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(json_data, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            # Casos que o orjson recusa (chaves não-str, inteiros grandes, aninhamento
+            # profundo) seguem pelo json padrão, que decide se são serializáveis
+            pass
+    canonical = json.dumps(json_data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return canonical.encode('utf-8')
+
+
+def schema_digest(json_data: Any) -> str:
+    """Hash canônico (chaves ordenadas, JSON compacto) usado como endereço do schema"""
+    return hashlib.sha256(canonical_json_bytes(json_data)).hexdigest()
+
+
+@dataclass(frozen=True)
+class EnrichedSchema:
+    """Schema enriquecido e seus bytes JSON canônicos, serializados uma única vez"""
+    data: Dict[str, Any]
+    json_bytes: bytes
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'EnrichedSchema':
+        return cls(data, canonical_json_bytes(data))
+
+
+class EnrichmentCache:
+    """
+    Cache LRU endereçado pelo conteúdo do schema de entrada.
+
+    As entradas são copiadas ao gravar e ao ler, de modo que nem a entrada do
+    chamador nem o resultado devolvido compartilham estrutura com o cache.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._entries: 'OrderedDict[tuple, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_enrich(
+        self, json_data: Dict[str, Any], enricher: Callable[[Dict[str, Any]], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        try:
+            key = (enricher.__name__, schema_digest(json_data))
+        except (TypeError, ValueError, RecursionError):
+            # Schema não serializável em JSON: não há endereço estável, enriquece direto
+            return enricher(json_data)
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy_json(cached)
+            self.misses += 1
+
+        enriched = _copy_json(enricher(json_data))
+
+        with self._lock:
+            self._entries[key] = enriched
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        return _copy_json(enriched)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+
+enrichment_cache = EnrichmentCache()
+
+
+def cached_enrich_json_schema(
+    json_data: Dict[str, Any], cache: Optional[EnrichmentCache] = None
+) -> Dict[str, Any]:
+    """enrich_json_schema com cache: schemas já vistos não são enriquecidos de novo"""
+    return (cache or enrichment_cache).get_or_enrich(json_data, enrich_json_schema)
+
+
+def cached_enrich_json_schema_recursive(
+    json_data: Dict[str, Any], cache: Optional[EnrichmentCache] = None
+) -> Dict[str, Any]:
+    """
+    enrich_json_schema_recursive com cache. A versão recursiva não altera a
+    entrada; as cópias só protegem a entrada guardada de chamadores que alteram
+    o resultado.
+    """
+    return (cache or enrichment_cache).get_or_enrich(json_data, enrich_json_schema_recursive)
+
+
+class SchemaRefResolver:
+    """Resolve $ref locais (#/...) de um schema, memorizando cada ponteiro já resolvido"""
+
+    def __init__(self, root: Dict[str, Any]):
+        self.root = root
+        self._resolved: Dict[str, Any] = {}
+
+    def resolve(self, ref: str) -> Any:
+        if ref in self._resolved:
+            return self._resolved[ref]
+        if not ref.startswith('#'):
+            raise ValueError(f"Apenas $ref locais são suportados: {ref}")
+
+        target: Any = self.root
+        try:
+            for token in ref[1:].split('/')[1:]:
+                token = token.replace('~1', '/').replace('~0', '~')
+                target = target[int(token)] if isinstance(target, list) else target[token]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise ValueError(f"$ref não encontrado no schema: {ref}") from None
+
+        self._resolved[ref] = target
+        return target
+
+
+# Uma checagem recebe (valor, caminho, lista de erros) e acrescenta os erros encontrados
+_Check = Callable[[Any, str, List[str]], None]
+
+_JSON_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    'string': lambda value: isinstance(value, str),
+    'number': lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    'integer': lambda value: isinstance(value, int) and not isinstance(value, bool),
+    'boolean': lambda value: isinstance(value, bool),
+    'object': lambda value: isinstance(value, dict),
+    'array': lambda value: isinstance(value, list),
+    'null': lambda value: value is None,
+}
+
+
+def _label(path: str) -> str:
+    return path or '<argumentos>'
+
+
+def _check_passes(check: _Check, value: Any) -> bool:
+    errors: List[str] = []
+    check(value, '', errors)
+    return not errors
+
+
+def _accept_any(value: Any, path: str, errors: List[str]) -> None:
+    return None
+
+
+class _ValidatorCompiler:
+    """Transforma um schema JSON em closures de validação, compilando cada $ref uma única vez"""
+
+    def __init__(self, root: Dict[str, Any]):
+        self.resolver = SchemaRefResolver(root)
+        self._refs: Dict[str, _Check] = {}
+
+    def _compile_ref(self, ref: str) -> _Check:
+        if ref in self._refs:
+            return self._refs[ref]
+
+        # Registra o indireto antes de compilar o alvo para suportar $ref recursivos
+        target: List[_Check] = []
+
+        def check_ref(value: Any, path: str, errors: List[str]) -> None:
+            target[0](value, path, errors)
+
+        self._refs[ref] = check_ref
+        target.append(self.compile(self.resolver.resolve(ref)))
+        return check_ref
+
+    def _compile_branches(self, branches: Any) -> List[_Check]:
+        return [self.compile(branch) for branch in branches] if isinstance(branches, list) else []
+
+    def compile(self, node: Any) -> _Check:
+        if not isinstance(node, dict):
+            return _accept_any
+
+        node_type = node.get('type')
+        types = [node_type] if isinstance(node_type, str) else node_type if isinstance(node_type, list) else None
+        type_checks = [_JSON_TYPE_CHECKS[t] for t in types if t in _JSON_TYPE_CHECKS] if types else []
+        expected = '/'.join(types) if types else ''
+        nullable = node.get('nullable') is True or bool(types and 'null' in types)
+
+        enum = node.get('enum')
+        enum_values: Any = None
+        if isinstance(enum, list):
+            try:
+                enum_values = frozenset(enum)
+            except TypeError:
+                enum_values = enum
+
+        properties = node.get('properties')
+        property_checks = (
+            {name: self.compile(sub) for name, sub in properties.items()}
+            if isinstance(properties, dict) else {}
+        )
+        required = tuple(node['required']) if isinstance(node.get('required'), list) else ()
+        additional = node.get('additionalProperties')
+        closed = additional is False
+        additional_check = self.compile(additional) if isinstance(additional, dict) else None
+        check_object = bool(property_checks or required or closed or additional_check)
+
+        items = node.get('items')
+        items_check = self.compile(items) if isinstance(items, dict) else None
+
+        all_of = self._compile_branches(node.get('allOf'))
+        any_of = self._compile_branches(node.get('anyOf'))
+        one_of = self._compile_branches(node.get('oneOf'))
+        ref = node.get('$ref')
+        ref_check = self._compile_ref(ref) if isinstance(ref, str) else None
+
+        def check(value: Any, path: str, errors: List[str]) -> None:
+            if value is None:
+                if nullable:
+                    return
+                if types:
+                    errors.append(f"{_label(path)}: não pode ser nulo")
+                    return
+            if type_checks and not any(type_check(value) for type_check in type_checks):
+                errors.append(f"{_label(path)}: tipo inválido, esperado {expected}")
+                return
+            if enum_values is not None:
+                try:
+                    allowed = value in enum_values
+                except TypeError:
+                    allowed = False
+                if not allowed:
+                    errors.append(f"{_label(path)}: valor {value!r} fora do enum")
+
+            if check_object and isinstance(value, dict):
+                for name in required:
+                    if name not in value:
+                        errors.append(f"{_label(path)}: campo obrigatório ausente: {name}")
+                for name, item in value.items():
+                    item_path = f"{path}.{name}" if path else name
+                    property_check = property_checks.get(name)
+                    if property_check is not None:
+                        property_check(item, item_path, errors)
+                    elif closed:
+                        errors.append(f"{item_path}: campo não permitido")
+                    elif additional_check is not None:
+                        additional_check(item, item_path, errors)
+
+            if items_check is not None and isinstance(value, list):
+                for index, item in enumerate(value):
+                    items_check(item, f"{path}[{index}]", errors)
+
+            for branch in all_of:
+                branch(value, path, errors)
+            if any_of and not any(_check_passes(branch, value) for branch in any_of):
+                errors.append(f"{_label(path)}: não corresponde a nenhum schema de anyOf")
+            if one_of and sum(_check_passes(branch, value) for branch in one_of) != 1:
+                errors.append(f"{_label(path)}: deve corresponder a exatamente um schema de oneOf")
+            if ref_check is not None:
+                ref_check(value, path, errors)
+
+        return check
+
+
+class ArgumentValidator:
+    """
+    Validador de argumentos compilado a partir do schema de parâmetros de uma
+    função: checa required, enum, tipos, nullable e additionalProperties=false
+    sem construir modelos Pydantic a cada chamada.
+    """
+
+    def __init__(self, parameters: Dict[str, Any]):
+        self._check = _ValidatorCompiler(parameters).compile(parameters)
+
+    def __call__(self, arguments: Any) -> List[str]:
+        """Retorna a lista de erros; vazia quando os argumentos são válidos"""
+        errors: List[str] = []
+        self._check(arguments, '', errors)
+        return errors
+
+    def validate_many(self, payloads: Iterable[Any]) -> List[List[str]]:
+        """Valida vários payloads de uma vez, devolvendo a lista de erros de cada um"""
+        check = self._check
+        results = []
+        for arguments in payloads:
+            errors: List[str] = []
+            check(arguments, '', errors)
+            results.append(errors)
+        return results
+
+
+validator_cache = EnrichmentCache(maxsize=1024)
+
+
+def compile_validator(parameters: Dict[str, Any]) -> ArgumentValidator:
+    """Compila o validador do schema de parâmetros, reaproveitando-o pelo hash do schema"""
+    return validator_cache.get_or_enrich(parameters, ArgumentValidator)
+
+
+@dataclass
+class CatalogEnrichmentResult:
+    """
+    Resultado de um item do catálogo; em caso de erro, schema é a entrada original.
+    json_bytes traz o JSON canônico do schema enriquecido quando solicitado.
+    """
+    index: int
+    schema: Dict[str, Any]
+    error: Optional[str] = None
+    json_bytes: Optional[bytes] = None
+
+
+def _enrich_catalog_item(
+    json_data: Dict[str, Any], serialize: bool = False
+) -> Tuple[Optional[Dict[str, Any]], Optional[str], Optional[bytes]]:
+    try:
+        enriched = _enrich_or_raise(json_data)
+    except (ValidationError, TypeError, ValueError) as e:
+        return None, f"{type(e).__name__}: {e}", None
+    return enriched, None, canonical_json_bytes(enriched) if serialize else None
+
+
+def enrich_catalog(
+    schemas: Iterable[Dict[str, Any]],
+    workers: int = 1,
+    parallel_threshold: int = 1024,
+    serialize: bool = False,
+) -> Iterator[CatalogEnrichmentResult]:
+    """
+    Enriquece um catálogo de ferramentas, devolvendo os resultados na ordem de entrada.
+
+    Schemas idênticos são enriquecidos uma única vez. Com workers > 1 e pelo
+    menos parallel_threshold schemas distintos, o trabalho é distribuído em um
+    pool de processos; abaixo disso o custo de serialização entre processos
+    não compensa. Erros de validação são reportados no item, sem abortar o lote.
+    Com serialize=True, a serialização canônica também é feita nos workers.
+    """
+    schemas = list(schemas)
+
+    # Deduplica pelo hash canônico, preservando a ordem da primeira ocorrência
+    unique_schemas: List[Dict[str, Any]] = []
+    unique_index_by_key: Dict[Any, int] = {}
+    unique_index_of: List[int] = []
+    for position, json_data in enumerate(schemas):
+        try:
+            key = schema_digest(json_data)
+        except (TypeError, ValueError, RecursionError):
+            key = ('position', position)
+        if key not in unique_index_by_key:
+            unique_index_by_key[key] = len(unique_schemas)
+            unique_schemas.append(json_data)
+        unique_index_of.append(unique_index_by_key[key])
+
+    enrich_item = partial(_enrich_catalog_item, serialize=serialize)
+    executor = None
+    if workers > 1 and len(unique_schemas) >= parallel_threshold:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        chunksize = max(1, len(unique_schemas) // (workers * 4))
+        unique_results = executor.map(enrich_item, unique_schemas, chunksize=chunksize)
+    else:
+        unique_results = map(enrich_item, unique_schemas)
+
+    try:
+        # Os índices únicos aparecem em ordem crescente ao percorrer a entrada,
+        # então basta consumir o iterador até o índice necessário
+        done: List[Tuple[Optional[Dict[str, Any]], Optional[str], Optional[bytes]]] = []
+        emitted = set()
+        for position, unique_index in enumerate(unique_index_of):
+            while len(done) <= unique_index:
+                done.append(next(unique_results))
+            enriched, error, json_bytes = done[unique_index]
+            if error is not None:
+                yield CatalogEnrichmentResult(position, schemas[position], error)
+                continue
+            # Duplicatas recebem cópias para não compartilharem estrutura entre si
+            if unique_index in emitted:
+                enriched = _copy_json(enriched)
+            emitted.add(unique_index)
+            yield CatalogEnrichmentResult(position, enriched, json_bytes=json_bytes)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def mcp_tool_to_function_schema(tool: Dict[str, Any]) -> Dict[str, Any]:
+    """Converte uma ferramenta de tools/list do MCP (name, description, inputSchema) no formato function"""
+    parameters = dict(tool.get('inputSchema') or {})
+    parameters.setdefault('properties', {})  # Ferramentas sem argumentos podem omitir properties
+    return {
+        'type': 'function',
+        'function': {
+            'name': tool['name'],
+            'description': tool.get('description') or '',
+            'parameters': parameters,
+        },
+    }
+
+
+class EnrichedCatalog:
+    """
+    Catálogo de ferramentas enriquecidas, indexado pelo nome da função.
+
+    Cada schema fica guardado com seus bytes JSON canônicos e a lista completa
+    é montada por concatenação desses bytes, sem reserializar a cada resposta
+    de tools/list; ela só é remontada quando o catálogo muda.
+
+    Ferramentas cujo schema não passa pelo enriquecimento (JSON Schema válido
+    que o PropertySchema não aceita, como enum de inteiros ou type em lista)
+    continuam no catálogo com o schema original; o erro fica só em errors,
+    como diagnóstico.
+    """
+
+    def __init__(self):
+        self._schemas: Dict[str, EnrichedSchema] = {}
+        self._list_bytes: Optional[bytes] = None
+        self.errors: List[CatalogEnrichmentResult] = []
+
+    @classmethod
+    def from_schemas(cls, schemas: Iterable[Dict[str, Any]], workers: int = 1) -> 'EnrichedCatalog':
+        """
+        Enriquece e serializa o catálogo de uma vez. Itens que falham no
+        enriquecimento entram sem enriquecer e são registrados em errors; só
+        ficam de fora os que nem têm function.name para indexar.
+        """
+        catalog = cls()
+        for result in enrich_catalog(schemas, workers=workers, serialize=True):
+            if result.error is None:
+                catalog.set(EnrichedSchema(result.schema, result.json_bytes))
+                continue
+            catalog.errors.append(result)
+            function = result.schema.get('function') if isinstance(result.schema, dict) else None
+            if isinstance(function, dict) and isinstance(function.get('name'), str):
+                try:
+                    catalog.set(EnrichedSchema.from_dict(result.schema))
+                except (TypeError, ValueError):
+                    pass  # Nem serializável em JSON: fica só o diagnóstico
+        return catalog
+
+    @classmethod
+    def from_mcp_tools(cls, tools: Iterable[Dict[str, Any]], workers: int = 1) -> 'EnrichedCatalog':
+        """from_schemas a partir da lista de ferramentas de um tools/list do MCP"""
+        return cls.from_schemas((mcp_tool_to_function_schema(tool) for tool in tools), workers=workers)
+
+    def set(self, schema: EnrichedSchema) -> None:
+        self._schemas[schema.data['function']['name']] = schema
+        self._list_bytes = None
+
+    def remove(self, name: str) -> None:
+        if self._schemas.pop(name, None) is not None:
+            self._list_bytes = None
+
+    def get(self, name: str) -> Optional[EnrichedSchema]:
+        return self._schemas.get(name)
+
+    def __len__(self) -> int:
+        return len(self._schemas)
+
+    def __iter__(self) -> Iterator[EnrichedSchema]:
+        return iter(self._schemas.values())
+
+    def list_json_bytes(self) -> bytes:
+        """Array JSON com todos os schemas, na ordem de inserção"""
+        if self._list_bytes is None:
+            self._list_bytes = b'[' + b','.join(schema.json_bytes for schema in self._schemas.values()) + b']'
+        return self._list_bytes
+
+
+def benchmark_enrichment(json_data: Dict[str, Any], iterations: int = 1000) -> Dict[str, float]:
+    """Compara o tempo médio por schema entre enrich_json_schema e enrich_json_schema_fast"""
+    if enrich_json_schema(json_data) != enrich_json_schema_fast(json_data):
+        raise AssertionError("enrich_json_schema_fast diverge de enrich_json_schema")
+
+    timings = {}
+    for label, enricher in (('pydantic', enrich_json_schema), ('fast', enrich_json_schema_fast)):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            enricher(json_data)
+        timings[label] = (time.perf_counter() - start) / iterations
+
+    timings['speedup'] = timings['pydantic'] / timings['fast']
+    return timings
+
+
+@dataclass
+class NdjsonStats:
+    """Contadores de throughput do processamento de NDJSON"""
+    records: int = 0
+    errors: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    started_at: float = 0.0
+    finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def records_per_second(self) -> float:
+        return self.records / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes_in / 1e6 / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.records} registros ({self.errors} com erro) em {self.elapsed:.2f}s: "
+                f"{self.records_per_second:.0f} registros/s, {self.mb_per_second:.1f} MB/s")
+
+
+# Variantes que levantam o erro: o NDJSON conta o registro como erro em vez de
+# imprimir a mensagem no stdout, que pode ser a própria saída
+_ENRICHERS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    'fast': _enrich_or_raise,
+    'pydantic': _enrich_pydantic_or_raise,
+    'recursive': enrich_json_schema_recursive,
+}
+
+
+def iter_enrich_ndjson(
+    lines: Iterable[bytes],
+    enricher: Callable[[Dict[str, Any]], Dict[str, Any]] = _enrich_or_raise,
+    stats: Optional[NdjsonStats] = None,
+) -> Iterator[bytes]:
+    """
+    Enriquece um fluxo NDJSON linha a linha, mantendo só um registro em memória.
+
+    Linhas em branco são ignoradas. Linhas que não são JSON válido, que não
+    são um objeto ou cujo schema não valida saem inalteradas, são contadas em
+    stats.errors e têm o diagnóstico escrito no stderr. O enricher deve
+    levantar ValueError/TypeError em vez de devolver a entrada.
+    """
+    if stats is None:
+        stats = NdjsonStats()
+    stats.started_at = time.perf_counter()
+
+    for line in lines:
+        stats.bytes_in += len(line)
+        if not line.strip():
+            continue
+        stats.records += 1
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise TypeError(f"esperado um objeto JSON, recebido {type(record).__name__}")
+            out = json.dumps(enricher(record), ensure_ascii=False).encode('utf-8') + b'\n'
+        except (ValueError, TypeError) as e:
+            stats.errors += 1
+            print(f"Registro {stats.records}: {str(e).splitlines()[0]}", file=sys.stderr)
+            out = line if line.endswith(b'\n') else line + b'\n'
+        stats.bytes_out += len(out)
+        yield out
+
+    stats.finished_at = time.perf_counter()
+
+
+def enrich_ndjson_file(
+    input_path: str,
+    output_path: str,
+    enricher: Callable[[Dict[str, Any]], Dict[str, Any]] = _enrich_or_raise,
+    progress_every: int = 0,
+) -> NdjsonStats:
+    """Reescreve um arquivo NDJSON de schemas enriquecidos; '-' usa stdin/stdout"""
+    stats = NdjsonStats()
+    source = sys.stdin.buffer if input_path == '-' else open(input_path, 'rb')
+    target = sys.stdout.buffer if output_path == '-' else open(output_path, 'wb')
+    try:
+        for out in iter_enrich_ndjson(source, enricher, stats):
+            target.write(out)
+            if progress_every and stats.records % progress_every == 0:
+                print(stats.summary(), file=sys.stderr)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if target is not sys.stdout.buffer:
+            target.close()
+        else:
+            target.flush()
+    return stats
+
+
+def main_ndjson(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Enriquece um catálogo de schemas em NDJSON")
+    parser.add_argument('input', help="arquivo NDJSON de entrada ('-' para stdin)")
+    parser.add_argument('-o', '--output', default='-', help="arquivo NDJSON de saída ('-' para stdout)")
+    parser.add_argument('--enricher', choices=sorted(_ENRICHERS), default='fast')
+    parser.add_argument('--progress-every', type=int, default=0,
+                        help="imprime o throughput a cada N registros")
+    args = parser.parse_args(argv)
+
+    stats = enrich_ndjson_file(args.input, args.output, _ENRICHERS[args.enricher], args.progress_every)
+    print(stats.summary(), file=sys.stderr)
+    return 1 if stats.errors else 0
+
+
 # Exemplo de uso
 if __name__ == "__main__":
+    # Com argumentos, roda o modo de linha de comando para arquivos NDJSON
+    if len(sys.argv) > 1:
+        sys.exit(main_ndjson(sys.argv[1:]))
+
     # Exemplo 1: Primeiro JSON (add_comment_to_pending_review)
     json_example_1 = {
         'type': 'function',
@@ -329,12 +1371,13 @@ if __name__ == "__main__":
         enriched_1 = enrich_json_schema(json_example)
         print(json.dumps(enriched_1, indent=2))
         
-        print("\n\nUsando Função Recursiva:")
-        enriched_2 = enrich_json_schema_recursive(json_example)
+        # A função recursiva opera sobre o schema de parâmetros, não sobre o envelope
+        print("\n\nUsando Função Recursiva (function.parameters):")
+        enriched_2 = enrich_json_schema_recursive(json_example['function']['parameters'])
         print(json.dumps(enriched_2, indent=2))
         
         # Verifica se os resultados são iguais
-        if enriched_1 == enriched_2:
+        if enriched_1['function']['parameters'] == enriched_2:
             print(f"\n✓ Ambos os métodos produzem o mesmo resultado para {example_name}")
         else:
             print(f"\n✗ Os métodos produzem resultados diferentes para {example_name}")
@@ -415,3 +1458,14 @@ if __name__ == "__main__":
         print("  ✓ additionalProperties: False foi adicionado corretamente!")
     else:
         print("  ✗ additionalProperties: False NÃO foi adicionado!")
+
+    # Benchmark do enriquecimento de passada única contra o caminho Pydantic
+    print(f"\n{'='*60}")
+    print("Benchmark: enrich_json_schema x enrich_json_schema_fast")
+    print(f"{'='*60}")
+
+    for example_name, json_example in (("add_comment_to_pending_review", json_example_1),
+                                       ("push_files", json_example_2)):
+        timings = benchmark_enrichment(json_example)
+        print(f"  {example_name:35} pydantic={timings['pydantic'] * 1e6:8.1f}us "
+              f"fast={timings['fast'] * 1e6:8.1f}us speedup={timings['speedup']:.1f}x")
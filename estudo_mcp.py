@@ -2,7 +2,6 @@
 from typing import Optional
 import aiohttp
 import asyncio
-import json
 import traceback
 import uuid
 
@@ -10,6 +9,8 @@ from mcp import ClientSession
 from mcp.types import CallToolResult
 from mcp.client.streamable_http import streamablehttp_client
 
+from mcp_client import iter_response_messages
+
 # O URL do seu servidor MCP (ou do LiteLLM Proxy Gateway)
 MCP_SERVER_URL = "http://127.0.0.1:8000/mcp" 
 
@@ -92,11 +93,6 @@ def _data_call_tool(tool_name: str, mcp_session_id: str, **kwargs):
     }
 
 
-def get_data_from_response(text: str) -> dict:
-    data = text.split("data: ")[-1]
-    return json.loads(data)
-
-
 async def outro_metodo(url: str, tool_name: str, **kwargs) -> dict:
     async with aiohttp.ClientSession() as http_session:
         async with http_session.post(url, headers=_headers(), json=_data_initialize()) as response:
@@ -106,8 +102,11 @@ async def outro_metodo(url: str, tool_name: str, **kwargs) -> dict:
         print("=========" * 19)
         mcp_session_id: str = data_headers.get("mcp-session-id")
         async with http_session.post(url, headers=_headers(mcp_session_id), json=_data_call_tool(tool_name, mcp_session_id, **kwargs)) as response:
-            data = await response.text()
-    return get_data_from_response(data)
+            # Lê o stream SSE evento a evento em vez de bufferizar o corpo inteiro
+            async for message in iter_response_messages(response):
+                if message.get("id") == mcp_session_id:
+                    return message
+    raise RuntimeError("Resposta da chamada não encontrada no stream")
 
 
 if __name__ == "__main__":
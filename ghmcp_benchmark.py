@@ -0,0 +1,234 @@
+"""
+Benchmark reproduzível dos caminhos de enriquecimento de Ghmcp.py.
+
+Gera schemas sintéticos de ferramentas variando largura, profundidade,
+aninhamento de arrays de objetos e tamanho do catálogo, mede cada caminho
+(ops/s, latência p50/p99 e pico de memória) e salva o resultado em JSON
+para comparar execuções.
+
+    python ghmcp_benchmark.py -o bench.json
+    python ghmcp_benchmark.py --compare bench.json
+"""
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from Ghmcp import (
+    enrich_json_schema,
+    enrich_json_schema_fast,
+    enrich_json_schema_recursive,
+)
+
+
+SCENARIOS: List[Dict[str, int]] = [
+    {'width': 5, 'depth': 1, 'array_nesting': 0, 'catalog_size': 100},
+    {'width': 10, 'depth': 2, 'array_nesting': 1, 'catalog_size': 100},
+    {'width': 30, 'depth': 1, 'array_nesting': 0, 'catalog_size': 100},
+    {'width': 5, 'depth': 5, 'array_nesting': 0, 'catalog_size': 50},
+    {'width': 5, 'depth': 2, 'array_nesting': 3, 'catalog_size': 50},
+    {'width': 10, 'depth': 2, 'array_nesting': 1, 'catalog_size': 1000},
+]
+
+QUICK_SCENARIOS: List[Dict[str, int]] = [
+    {'width': 5, 'depth': 1, 'array_nesting': 0, 'catalog_size': 20},
+    {'width': 5, 'depth': 2, 'array_nesting': 1, 'catalog_size': 20},
+]
+
+
+def _generate_object(rng: random.Random, width: int, depth: int, array_nesting: int) -> Dict[str, Any]:
+    properties: Dict[str, Any] = {}
+    for i in range(width):
+        name = f"field_{i}"
+        kind = rng.random()
+        if depth > 1 and kind < 0.3:
+            properties[name] = _generate_object(rng, width, depth - 1, array_nesting)
+        elif array_nesting > 0 and kind < 0.5:
+            # array de objetos, possivelmente array de array de objetos
+            items = _generate_object(rng, width, max(depth - 1, 1), array_nesting - 1)
+            for _ in range(rng.randint(0, array_nesting - 1)):
+                items = {'type': 'array', 'items': items}
+            properties[name] = {'type': 'array', 'description': f"Lista {name}", 'items': items}
+        elif kind < 0.7:
+            properties[name] = {'type': 'string', 'description': f"Campo {name}",
+                                'enum': ['LEFT', 'RIGHT']}
+        else:
+            properties[name] = {'type': rng.choice(['string', 'number', 'boolean']),
+                                'description': f"Campo {name}"}
+
+    required = sorted(rng.sample(sorted(properties), k=width // 2))
+    return {'type': 'object', 'required': required, 'properties': properties}
+
+
+def generate_tool_schema(
+    name: str, width: int, depth: int, array_nesting: int, seed: int = 0
+) -> Dict[str, Any]:
+    """Gera um schema de ferramenta no formato {'type': 'function', 'function': ...}"""
+    rng = random.Random(f"{seed}:{name}")
+    parameters = _generate_object(rng, width, depth, array_nesting)
+    parameters['additionalProperties'] = False
+    return {
+        'type': 'function',
+        'function': {
+            'name': name,
+            'description': f"Ferramenta sintética {name}",
+            'parameters': parameters,
+            'strict': False,
+        },
+    }
+
+
+def generate_catalog(
+    catalog_size: int, width: int, depth: int, array_nesting: int, seed: int = 0
+) -> List[Dict[str, Any]]:
+    return [
+        generate_tool_schema(f"tool_{i}", width, depth, array_nesting, seed)
+        for i in range(catalog_size)
+    ]
+
+
+def _enrich_parameters_recursive(json_data: Dict[str, Any]) -> Dict[str, Any]:
+    """enrich_json_schema_recursive opera sobre o schema de parâmetros, não sobre o envelope"""
+    return enrich_json_schema_recursive(json_data['function']['parameters'])
+
+
+PATHS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    'pydantic': enrich_json_schema,
+    'fast': enrich_json_schema_fast,
+    'recursive': _enrich_parameters_recursive,
+}
+
+
+def assert_paths_agree(catalog: List[Dict[str, Any]]) -> None:
+    """Garante que todos os caminhos produzem o mesmo resultado antes de medir"""
+    for json_data in catalog:
+        reference = enrich_json_schema(json_data)
+        name = json_data['function']['name']
+        if enrich_json_schema_fast(json_data) != reference:
+            raise AssertionError(f"fast diverge de pydantic em {name}")
+        if _enrich_parameters_recursive(json_data) != reference['function']['parameters']:
+            raise AssertionError(f"recursive diverge de pydantic em {name}")
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure_path(
+    enricher: Callable[[Dict[str, Any]], Dict[str, Any]],
+    catalog: List[Dict[str, Any]],
+    repeat: int,
+) -> Dict[str, float]:
+    # Aquecimento fora da medição
+    for json_data in catalog:
+        enricher(json_data)
+
+    latencies: List[float] = []
+    perf_counter = time.perf_counter
+    started = perf_counter()
+    for _ in range(repeat):
+        for json_data in catalog:
+            t0 = perf_counter()
+            enricher(json_data)
+            latencies.append(perf_counter() - t0)
+    elapsed = perf_counter() - started
+    latencies.sort()
+
+    # Pico de memória em uma passada separada, já que o tracemalloc distorce os tempos
+    tracemalloc.start()
+    for json_data in catalog:
+        enricher(json_data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'ops_per_second': len(latencies) / elapsed,
+        'p50_us': _percentile(latencies, 0.50) * 1e6,
+        'p99_us': _percentile(latencies, 0.99) * 1e6,
+        'peak_memory_kb': peak / 1024,
+    }
+
+
+def run_benchmarks(
+    scenarios: List[Dict[str, int]], repeat: int = 5, seed: int = 0
+) -> Dict[str, Any]:
+    results = []
+    for scenario in scenarios:
+        catalog = generate_catalog(seed=seed, **scenario)
+        assert_paths_agree(catalog)
+        paths = {name: measure_path(enricher, catalog, repeat) for name, enricher in PATHS.items()}
+        results.append({'scenario': scenario, 'paths': paths})
+        print(_format_row(scenario, paths))
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'seed': seed,
+        'results': results,
+    }
+
+
+def _scenario_key(scenario: Dict[str, int]) -> str:
+    return "w{width}-d{depth}-a{array_nesting}-n{catalog_size}".format(**scenario)
+
+
+def _format_row(scenario: Dict[str, int], paths: Dict[str, Dict[str, float]]) -> str:
+    cells = [
+        f"{name}={stats['ops_per_second']:9.0f} ops/s p50={stats['p50_us']:8.1f}us "
+        f"p99={stats['p99_us']:8.1f}us mem={stats['peak_memory_kb']:8.1f}KB"
+        for name, stats in paths.items()
+    ]
+    return "\n".join([_scenario_key(scenario)] + [f"    {cell}" for cell in cells])
+
+
+def compare_results(previous: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.10) -> List[str]:
+    """Lista os cenários/caminhos cujo ops/s caiu mais que a tolerância"""
+    previous_by_key = {_scenario_key(r['scenario']): r['paths'] for r in previous['results']}
+    regressions = []
+    for result in current['results']:
+        key = _scenario_key(result['scenario'])
+        for name, stats in result['paths'].items():
+            baseline = previous_by_key.get(key, {}).get(name)
+            if not baseline:
+                continue
+            ratio = stats['ops_per_second'] / baseline['ops_per_second']
+            if ratio < 1 - tolerance:
+                regressions.append(f"{key} {name}: {ratio:.2f}x do baseline")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark dos caminhos de enriquecimento de schemas")
+    parser.add_argument('-o', '--output', help="arquivo JSON onde salvar os resultados")
+    parser.add_argument('--compare', help="resultado JSON anterior para detectar regressões")
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--quick', action='store_true', help="cenários pequenos, para checagem rápida")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(QUICK_SCENARIOS if args.quick else SCENARIOS, args.repeat, args.seed)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_results(json.load(f), results, args.tolerance)
+        for regression in regressions:
+            print(f"✗ regressão: {regression}")
+        if regressions:
+            return 1
+        print("✓ sem regressões em relação ao baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
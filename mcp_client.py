@@ -1,22 +1,557 @@
+import asyncio
+import random
+import threading
+import time
 import uuid
 import json
 import aiohttp
-from typing import Optional
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, TextIO, Tuple
+
+from Ghmcp import EnrichedCatalog, _copy_json
+from metrics import LatencyHistogram, prometheus_labels, render_histograms
+from singleflight import SingleFlight
+
+DEFAULT_CONNECTION_LIMIT = 100
+DEFAULT_LIMIT_PER_HOST = 32
+DEFAULT_KEEPALIVE_TIMEOUT = 30.0
+
+
+def build_http_session(
+    limit: int = DEFAULT_CONNECTION_LIMIT,
+    limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+    keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+    trace_configs: Optional[List[aiohttp.TraceConfig]] = None,
+) -> aiohttp.ClientSession:
+    # Conexões keep-alive reaproveitadas entre chamadas, com limite por host
+    # para não afogar um único servidor MCP e cache de DNS
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        keepalive_timeout=keepalive_timeout,
+        ttl_dns_cache=300,
+    )
+    return aiohttp.ClientSession(connector=connector, trace_configs=trace_configs)
+
+
+class RequestRecord:
+    """Medições de uma requisição: fases em segundos (None quando não ocorreram) e bytes"""
+    __slots__ = (
+        "operation", "tool", "started", "dns", "connect", "ttfb", "total",
+        "bytes_out", "bytes_in", "status", "error", "cancelled", "_dns_started", "_connect_started",
+    )
+
+    def __init__(self, operation: str, tool: str):
+        self.operation = operation
+        self.tool = tool
+        self.started = time.perf_counter()
+        self.dns = self.connect = self.ttfb = self.total = None
+        self.bytes_out = self.bytes_in = 0
+        self.status: Optional[int] = None
+        self.error = False
+        # Cancelada pelo próprio cliente (perdedora de um hedge, por exemplo): não é erro
+        self.cancelled = False
+        self._dns_started = self._connect_started = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "operation": self.operation,
+            "tool": self.tool,
+            "dns": self.dns,
+            "connect": self.connect,
+            "ttfb": self.ttfb,
+            "total": self.total,
+            "bytes_out": self.bytes_out,
+            "bytes_in": self.bytes_in,
+            "status": self.status,
+            "error": self.error,
+            "cancelled": self.cancelled,
+        }
+
+
+class InMemorySink:
+    """Guarda as últimas maxlen requisições, para inspeção em testes e depuração"""
+
+    def __init__(self, maxlen: int = 10000):
+        self.records = deque(maxlen=maxlen)
+
+    def record(self, record: RequestRecord):
+        self.records.append(record.as_dict())
+
+
+class JsonLinesSink:
+    """Escreve uma linha JSON por requisição no stream informado"""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+
+    def record(self, record: RequestRecord):
+        self.stream.write(json.dumps(record.as_dict()) + "\n")
+
+
+class ClientMetrics:
+    """
+    Instrumentação de initialize/call_tool: histogramas por operação, ferramenta
+    e fase (dns, connect, ttfb, total), bytes enviados/recebidos, requisições
+    em andamento, erros e cancelamentos (que não contam como erro). DNS e
+    connect vêm do TraceConfig do aiohttp e só aparecem quando a ClientSession
+    é criada com trace_config(). Sinks recebem cada RequestRecord finalizado.
+    """
+
+    PHASES = ("dns", "connect", "ttfb", "total")
+
+    def __init__(self, sinks: Optional[List[Any]] = None):
+        self.sinks = list(sinks or [])
+        self.histograms: Dict[Tuple[str, str, str], LatencyHistogram] = {}
+        self.requests: Dict[Tuple[str, str], int] = {}
+        self.errors: Dict[Tuple[str, str], int] = {}
+        self.cancelled: Dict[Tuple[str, str], int] = {}
+        self.bytes_out: Dict[Tuple[str, str], int] = {}
+        self.bytes_in: Dict[Tuple[str, str], int] = {}
+        self.in_flight: Dict[Tuple[str, str], int] = {}
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_dns_start(session, context, params):
+            if context.trace_request_ctx is not None:
+                context.trace_request_ctx._dns_started = time.perf_counter()
+
+        async def on_dns_end(session, context, params):
+            record = context.trace_request_ctx
+            if record is not None:
+                record.dns = time.perf_counter() - record._dns_started
+
+        async def on_connect_start(session, context, params):
+            if context.trace_request_ctx is not None:
+                context.trace_request_ctx._connect_started = time.perf_counter()
+
+        async def on_connect_end(session, context, params):
+            record = context.trace_request_ctx
+            if record is not None:
+                record.connect = time.perf_counter() - record._connect_started
+
+        async def on_chunk_sent(session, context, params):
+            if context.trace_request_ctx is not None:
+                context.trace_request_ctx.bytes_out += len(params.chunk)
+
+        trace_config.on_dns_resolvehost_start.append(on_dns_start)
+        trace_config.on_dns_resolvehost_end.append(on_dns_end)
+        trace_config.on_connection_create_start.append(on_connect_start)
+        trace_config.on_connection_create_end.append(on_connect_end)
+        trace_config.on_request_chunk_sent.append(on_chunk_sent)
+        return trace_config
+
+    def start(self, operation: str, tool: str) -> RequestRecord:
+        key = (operation, tool)
+        self.in_flight[key] = self.in_flight.get(key, 0) + 1
+        return RequestRecord(operation, tool)
+
+    def finish(self, record: RequestRecord):
+        record.total = time.perf_counter() - record.started
+        key = (record.operation, record.tool)
+        self.in_flight[key] -= 1
+        self.requests[key] = self.requests.get(key, 0) + 1
+        if record.cancelled:
+            self.cancelled[key] = self.cancelled.get(key, 0) + 1
+        elif record.error:
+            self.errors[key] = self.errors.get(key, 0) + 1
+        self.bytes_out[key] = self.bytes_out.get(key, 0) + record.bytes_out
+        self.bytes_in[key] = self.bytes_in.get(key, 0) + record.bytes_in
+
+        for phase in self.PHASES:
+            seconds = getattr(record, phase)
+            if seconds is not None:
+                histogram = self.histograms.get(key + (phase,))
+                if histogram is None:
+                    histogram = self.histograms[key + (phase,)] = LatencyHistogram()
+                histogram.observe(seconds)
+
+        for sink in self.sinks:
+            sink.record(record)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Resumo por operação/ferramenta: contagens, taxa de erro, bytes e p50/p99 por fase"""
+        summary = {}
+        for key, count in self.requests.items():
+            errors = self.errors.get(key, 0)
+            entry = {
+                "requests": count,
+                "errors": errors,
+                "error_rate": errors / count,
+                "cancelled": self.cancelled.get(key, 0),
+                "bytes_out": self.bytes_out.get(key, 0),
+                "bytes_in": self.bytes_in.get(key, 0),
+                "in_flight": self.in_flight.get(key, 0),
+            }
+            for phase in self.PHASES:
+                histogram = self.histograms.get(key + (phase,))
+                if histogram is not None:
+                    entry[f"{phase}_p50"] = histogram.quantile(0.50)
+                    entry[f"{phase}_p99"] = histogram.quantile(0.99)
+            summary[f"{key[0]}:{key[1]}" if key[1] else key[0]] = entry
+        return summary
+
+    def to_prometheus(self) -> str:
+        """Métricas no formato texto de exposição do Prometheus"""
+        lines = render_histograms(
+            "mcp_client_request_duration_seconds", ("operation", "tool", "phase"), self.histograms
+        )
+
+        for name, kind, values in (
+            ("mcp_client_requests_total", "counter", self.requests),
+            ("mcp_client_errors_total", "counter", self.errors),
+            ("mcp_client_cancelled_total", "counter", self.cancelled),
+            ("mcp_client_sent_bytes_total", "counter", self.bytes_out),
+            ("mcp_client_received_bytes_total", "counter", self.bytes_in),
+            ("mcp_client_in_flight_requests", "gauge", self.in_flight),
+        ):
+            lines.append(f"# TYPE {name} {kind}")
+            for (operation, tool), value in sorted(values.items()):
+                lines.append(f"{name}{prometheus_labels(operation=operation, tool=tool)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class SSEEvent(NamedTuple):
+    event: str
+    data: str
+    id: Optional[str] = None
+
+
+async def iter_sse_events(content: aiohttp.StreamReader) -> AsyncIterator[SSEEvent]:
+    """
+    Parser incremental de Server-Sent Events: entrega cada evento assim que a
+    linha em branco que o encerra chega, guardando em memória só a linha e o
+    evento correntes. Lê por blocos, então linhas grandes não esbarram no
+    limite de tamanho de linha do StreamReader.
+    """
+    buffer = bytearray()
+    scanned = 0
+    event_type, event_id, data_lines = "message", None, []
+
+    async for chunk in content.iter_any():
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", max(start, scanned))
+            if end < 0:
+                break
+            line = bytes(buffer[start:end])
+            if line.endswith(b"\r"):
+                line = line[:-1]
+            start = end + 1
+
+            if not line:
+                if data_lines:
+                    yield SSEEvent(event_type, b"\n".join(data_lines).decode("utf-8"), event_id)
+                event_type, data_lines = "message", []
+                continue
+            if line.startswith(b":"):
+                continue
+            field, _, value = line.partition(b":")
+            if value.startswith(b" "):
+                value = value[1:]
+            if field == b"data":
+                data_lines.append(value)
+            elif field == b"event":
+                event_type = value.decode("utf-8")
+            elif field == b"id":
+                event_id = value.decode("utf-8")
+
+        del buffer[:start]
+        scanned = len(buffer)
+
+    # Stream encerrado sem a linha em branco final
+    if data_lines:
+        yield SSEEvent(event_type, b"\n".join(data_lines).decode("utf-8"), event_id)
+
+
+async def iter_response_messages(response: aiohttp.ClientResponse) -> AsyncIterator[dict]:
+    """Mensagens JSON-RPC da resposta, uma a uma; lotes (arrays) são achatados"""
+    if response.content_type == "text/event-stream":
+        async for event in iter_sse_events(response.content):
+            if not event.data:
+                continue
+            payload = json.loads(event.data)
+            for message in payload if isinstance(payload, list) else [payload]:
+                yield message
+    else:
+        body = await response.read()
+        if body.strip():
+            payload = json.loads(body)
+            for message in payload if isinstance(payload, list) else [payload]:
+                yield message
+
+
+def _is_error_response(response: dict) -> bool:
+    # Erro de protocolo JSON-RPC ou erro da própria ferramenta (result.isError)
+    result = response.get("result")
+    return "error" in response or not isinstance(result, dict) or bool(result.get("isError"))
+
+
+class ToolResponseCache:
+    """
+    Cache opcional de respostas de ferramentas idempotentes.
+
+    Só as ferramentas com TTL em ttls (ou todas, com default_ttl) são
+    cacheadas; a chave é o nome da ferramenta mais os argumentos em JSON
+    canônico. Chamadas idênticas concorrentes esperam a mesma requisição
+    (single-flight) e respostas de erro não são guardadas. Cada leitura
+    devolve uma cópia, então o chamador pode alterar o resultado à vontade.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: Optional[float] = None,
+        maxsize: int = 1024,
+    ):
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, dict]]" = OrderedDict()
+        self._inflight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def ttl_for(self, tool_name: str) -> Optional[float]:
+        return self.ttls.get(tool_name, self.default_ttl)
+
+
+    async def get_or_call(
+        self, tool_name: str, arguments: dict, call: Callable[[], Awaitable[dict]]
+    ) -> dict:
+        ttl = self.ttl_for(tool_name)
+        if ttl is None:
+            return await call()
+
+        key = (tool_name, json.dumps(arguments, sort_keys=True, separators=(",", ":")))
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy_json(entry[1])
+            del self._entries[key]
+
+        if key in self._inflight:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        return _copy_json(await self._inflight.do(key, lambda: self._call_and_store(key, ttl, call)))
+
+    async def _call_and_store(
+        self, key: Tuple[str, str], ttl: float, call: Callable[[], Awaitable[dict]]
+    ) -> dict:
+        response = await call()
+        if not _is_error_response(response):
+            self._entries[key] = (time.monotonic() + ttl, _copy_json(response))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return response
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
+
+
+class ToolCatalogCache:
+    """
+    Catálogo de ferramentas por servidor (URL), já enriquecido pelo Ghmcp.
+
+    O tools/list só é refeito quando o servidor avisa com
+    notifications/tools/list_changed, quando a sessão é reiniciada ou depois
+    de ttl segundos. O enriquecimento roda numa thread do executor padrão,
+    fora do event loop, e atualizações concorrentes do mesmo servidor
+    compartilham um único tools/list. O EnrichedCatalog devolvido é
+    compartilhado e não deve ser alterado.
+    """
+
+    def __init__(self, ttl: Optional[float] = 300.0):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, EnrichedCatalog]] = {}
+        self._inflight = SingleFlight()
+        # Incrementada a cada invalidação: uma atualização iniciada antes dela não é guardada
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.refreshes = 0
+        self.invalidations = 0
+
+    async def get(self, url: str, list_tools: Callable[[], Awaitable[List[dict]]]) -> EnrichedCatalog:
+        entry = self._entries.get(url)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            del self._entries[url]
+
+        return await self._inflight.do(url, lambda: self._refresh(url, list_tools))
+
+    async def _refresh(self, url: str, list_tools: Callable[[], Awaitable[List[dict]]]) -> EnrichedCatalog:
+        generation = self._generations.get(url, 0)
+        tools = await list_tools()
+        loop = asyncio.get_running_loop()
+        catalog = await loop.run_in_executor(None, EnrichedCatalog.from_mcp_tools, tools)
+
+        self.refreshes += 1
+        if self._generations.get(url, 0) == generation:
+            expires = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+            self._entries[url] = (expires, catalog)
+        return catalog
+
+    def invalidate(self, url: Optional[str] = None):
+        urls = [url] if url is not None else set(self._entries) | set(self._inflight.keys())
+        for key in urls:
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "refreshes": self.refreshes,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+        }
+
+
+class SessionExpiredError(RuntimeError):
+    """O servidor não reconhece mais o MCP-Session-ID (HTTP 404)"""
+
+
+RETRYABLE_STATUSES = (429, 502, 503, 504)
+
+
+class RetryPolicy:
+    """
+    Retentativas com backoff exponencial e jitter completo, só para as
+    ferramentas em idempotent_tools, já que uma falha de rede não diz se a
+    chamada chegou a executar. Falhas de conexão e HTTP 429/502/503/504 são
+    retentadas enquanto a espera não passar do prazo da chamada (timeout do
+    MCPClient). Não há timeout por tentativa: estourado o prazo, a chamada
+    inteira falha com TimeoutError, sem nova tentativa.
+
+    hedge_after mapeia ferramenta -> segundos: se a resposta não chegar nesse
+    tempo, uma segunda requisição idêntica é disparada e vale a primeira que
+    responder, o que limita o p99 quando uma réplica está lenta.
+    """
+
+    def __init__(
+        self,
+        idempotent_tools: Iterable[str] = (),
+        max_attempts: int = 3,
+        backoff: float = 0.05,
+        max_backoff: float = 1.0,
+        hedge_after: Optional[Dict[str, float]] = None,
+    ):
+        self.idempotent_tools = frozenset(idempotent_tools)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_after = dict(hedge_after or {})
+        for tool_name in self.hedge_after:
+            if tool_name not in self.idempotent_tools:
+                raise ValueError(f"Hedged tool must be idempotent: {tool_name}")
+        self.retries = 0
+        self.hedges = 0
+
+    def attempts_for(self, tool_name: str) -> int:
+        return self.max_attempts if tool_name in self.idempotent_tools else 1
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def stats(self) -> Dict[str, int]:
+        return {"retries": self.retries, "hedges": self.hedges}
+
 
 class MCPClient:
-    def __init__(self, url: str):
+    def __init__(
+        self,
+        url: str,
+        session: Optional[aiohttp.ClientSession] = None,
+        response_cache: Optional[ToolResponseCache] = None,
+        metrics: Optional[ClientMetrics] = None,
+        timeout: Optional[float] = None,
+        timeouts: Optional[Dict[str, float]] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        tool_catalog: Optional[ToolCatalogCache] = None,
+    ):
         self.url = url
-        self.session: Optional[aiohttp.ClientSession] = None
+        self.session: Optional[aiohttp.ClientSession] = session
+        self._owns_session = session is None
+        self.response_cache = response_cache
+        self.metrics = metrics
+        # Prazo total da chamada, incluindo retentativas e reinicialização
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+        self.retry_policy = retry_policy
+        self.tool_catalog = tool_catalog if tool_catalog is not None else ToolCatalogCache()
         self.mcp_session_id: Optional[str] = None
+        self.reinitializations = 0
+        self._initialize_lock = asyncio.Lock()
+        # None até a primeira tentativa de lote; servidores em 2025-06-18+ não aceitam lotes
+        self.batch_supported: Optional[bool] = None
 
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        if not self.session:
+            self.session = self._build_session()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
+        if self.session and self._owns_session:
             await self.session.close()
 
+    def _build_session(self) -> aiohttp.ClientSession:
+        trace_configs = [self.metrics.trace_config()] if self.metrics is not None else None
+        return build_http_session(trace_configs=trace_configs)
+
+    @asynccontextmanager
+    async def _post(self, payload: Any, operation: str, tool: str = "", headers: Optional[dict] = None):
+        # Sem métricas o custo é só o if; com elas, o record acompanha a
+        # requisição pelos callbacks do TraceConfig
+        if headers is None:
+            headers = self._get_headers()
+        if self.metrics is None:
+            async with self.session.post(self.url, headers=headers, json=payload) as response:
+                yield response, None
+            return
+
+        record = self.metrics.start(operation, tool)
+        try:
+            async with self.session.post(
+                self.url, headers=headers, json=payload, trace_request_ctx=record
+            ) as response:
+                record.ttfb = time.perf_counter() - record.started
+                record.status = response.status
+                record.error = response.status >= 400
+                try:
+                    yield response, record
+                finally:
+                    # Conta também o que foi lido em stream, fora de read()/text()
+                    record.bytes_in = response.content.total_bytes
+        except asyncio.CancelledError:
+            record.cancelled = True
+            raise
+        except BaseException:
+            record.error = True
+            raise
+        finally:
+            self.metrics.finish(record)
+
     def _get_headers(self) -> dict:
         headers = {
             "Content-Type": "application/json",
@@ -48,7 +583,9 @@ class MCPClient:
     def _build_call_tool_data(self, tool_name: str, **kwargs) -> dict:
         return {
             "jsonrpc": "2.0",
-            "id": self.mcp_session_id,
+            # id único por requisição: chamadas concorrentes na mesma sessão
+            # MCP não podem compartilhar o id
+            "id": str(uuid.uuid4()),
             "method": "tools/call",
             "params": {
                 "name": tool_name,
@@ -56,46 +593,471 @@ class MCPClient:
             }
         }
 
-    @staticmethod
-    def _parse_response_data(text: str) -> dict:
-        data = text.split("data: ")[-1]
-        return json.loads(data)
+    def _build_list_tools_data(self, cursor: Optional[str] = None) -> dict:
+        return {
+            "jsonrpc": "2.0",
+            "id": str(uuid.uuid4()),
+            "method": "tools/list",
+            "params": {"cursor": cursor} if cursor else {},
+        }
+
+    async def _ensure_initialized(self):
+        if not self.session or not self.mcp_session_id:
+            await self._reinitialize(self.mcp_session_id)
+
+    async def _reinitialize(self, stale_session_id: Optional[str]):
+        # Chamadas concorrentes que viram a mesma sessão expirar fazem um único handshake
+        async with self._initialize_lock:
+            if self.session and self.mcp_session_id and self.mcp_session_id != stale_session_id:
+                return
+            await self.initialize()
+            if not self.mcp_session_id:
+                raise RuntimeError("Server did not return an MCP-Session-ID on initialize")
+            if stale_session_id is not None:
+                self.reinitializations += 1
+                # Sessão nova pode ser um servidor reiniciado, com outras ferramentas
+                self.tool_catalog.invalidate(self.url)
+
+    def _handle_notification(self, message: dict):
+        if message.get("method") == "notifications/tools/list_changed":
+            self.tool_catalog.invalidate(self.url)
+
+    async def list_tools(self) -> List[dict]:
+        """tools/list completo no formato do MCP, seguindo a paginação por cursor"""
+        await self._ensure_initialized()
+        tools: List[dict] = []
+        cursor: Optional[str] = None
+        reinitialized = False
+        while True:
+            session_id = self.mcp_session_id
+            try:
+                message = await self._post_request(self._build_list_tools_data(cursor))
+            except SessionExpiredError:
+                if reinitialized:
+                    raise
+                reinitialized = True
+                await self._reinitialize(session_id)
+                tools, cursor = [], None
+                continue
+            if "error" in message:
+                raise RuntimeError(f"tools/list failed: {message['error']}")
+            tools.extend(message["result"].get("tools", []))
+            cursor = message["result"].get("nextCursor")
+            if not cursor:
+                return tools
+
+    async def tools(self) -> EnrichedCatalog:
+        """Catálogo enriquecido do servidor, servido do ToolCatalogCache"""
+        return await self.tool_catalog.get(self.url, self.list_tools)
+
+    async def watch_notifications(self):
+        """
+        Mantém aberto o stream GET de mensagens iniciadas pelo servidor e trata
+        as notificações (list_changed invalida o catálogo). Roda até ser
+        cancelado ou o servidor encerrar o stream; servidores sem esse stream
+        respondem 405 e a função retorna.
+        """
+        await self._ensure_initialized()
+        headers = self._get_headers()
+        headers["Accept"] = "text/event-stream"
+        async with self.session.get(
+            self.url, headers=headers, timeout=aiohttp.ClientTimeout(total=None)
+        ) as response:
+            if response.status == 405:
+                return
+            self._check_status(response)
+            response.raise_for_status()
+            async for message in iter_response_messages(response):
+                if "method" in message:
+                    self._handle_notification(message)
 
     async def initialize(self):
         if not self.session:
-            self.session = aiohttp.ClientSession()
+            self.session = self._build_session()
 
-        async with self.session.post(
-            self.url,
-            headers=self._get_headers(),
-            json=self._build_initialize_data()
-        ) as response:
+        # O handshake não pode levar a sessão antiga: o transporte responde 404
+        # a qualquer MCP-Session-ID desconhecido, inclusive no initialize
+        headers = self._get_headers()
+        headers.pop("MCP-Session-ID", None)
+        async with self._post(self._build_initialize_data(), "initialize", headers=headers) as (response, _):
+            self._check_status(response)
+            response.raise_for_status()
             self.mcp_session_id = response.headers.get("mcp-session-id")
             data = await response.text()
-            
-        print("Resposta de inicialização:", data)
-        print("=" * 40)
+
         return data
 
     async def call_tool(self, tool_name: str, **kwargs) -> dict:
-        if not self.session or not self.mcp_session_id:
-            raise RuntimeError("Client not initialized. Call initialize() first.")
+        await self._ensure_initialized()
+        if self.response_cache is not None:
+            return await self.response_cache.get_or_call(
+                tool_name, kwargs, lambda: self._call_with_policy(tool_name, kwargs)
+            )
+        return await self._call_with_policy(tool_name, kwargs)
 
-        async with self.session.post(
-            self.url,
-            headers=self._get_headers(),
-            json=self._build_call_tool_data(tool_name, **kwargs)
-        ) as response:
-            data = await response.text()
+    def _timeout_for(self, tool_name: str) -> Optional[float]:
+        return self.timeouts.get(tool_name, self.timeout)
+
+    async def _call_with_policy(self, tool_name: str, arguments: dict) -> dict:
+        timeout = self._timeout_for(tool_name)
+        if timeout is None:
+            return await self._call_with_retries(tool_name, arguments, None)
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(
+            self._call_with_retries(tool_name, arguments, loop.time() + timeout), timeout
+        )
+
+    async def _call_with_retries(self, tool_name: str, arguments: dict, deadline: Optional[float]) -> dict:
+        policy = self.retry_policy
+        attempts = policy.attempts_for(tool_name) if policy is not None else 1
+        hedge_after = policy.hedge_after.get(tool_name) if policy is not None else None
+        reinitialized = False
+        attempt = 0
+        while True:
+            session_id = self.mcp_session_id
+            try:
+                if hedge_after is not None:
+                    return await self._hedged_request(tool_name, arguments, hedge_after)
+                return await self._post_request(self._build_call_tool_data(tool_name, **arguments))
+            except SessionExpiredError:
+                # A requisição foi recusada antes de executar: reenviar é seguro
+                # para qualquer ferramenta, mas só uma vez
+                if reinitialized:
+                    raise
+                reinitialized = True
+                await self._reinitialize(session_id)
+            except (aiohttp.ClientConnectionError, aiohttp.ClientResponseError) as e:
+                if isinstance(e, aiohttp.ClientResponseError) and e.status not in RETRYABLE_STATUSES:
+                    raise
+                attempt += 1
+                if attempt >= attempts:
+                    raise
+                delay = policy.delay(attempt)
+                if deadline is not None and asyncio.get_running_loop().time() + delay >= deadline:
+                    raise
+                policy.retries += 1
+                await asyncio.sleep(delay)
+
+    async def _hedged_request(self, tool_name: str, arguments: dict, hedge_after: float) -> dict:
+        first = asyncio.ensure_future(self._post_request(self._build_call_tool_data(tool_name, **arguments)))
+        pending = {first}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_after)
+            if done:
+                return first.result()
+
+            self.retry_policy.hedges += 1
+            pending.add(asyncio.ensure_future(
+                self._post_request(self._build_call_tool_data(tool_name, **arguments))
+            ))
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream_tool(
+        self,
+        tool_name: str,
+        arguments: Optional[dict] = None,
+        progress_token: Optional[str] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Executa a ferramenta e entrega cada mensagem do stream assim que chega:
+        notificações (progresso, logs, resultados parciais) e, por último, a
+        resposta da chamada. Com progress_token o servidor é convidado a
+        enviar notifications/progress.
+        """
+        await self._ensure_initialized()
+        request = self._build_call_tool_data(tool_name, **(arguments or {}))
+        if progress_token is not None:
+            request["params"]["_meta"] = {"progressToken": progress_token}
+
+        async with self._post(request, "tools/call", tool_name) as (response, record):
+            async for message in iter_response_messages(response):
+                if "method" in message:
+                    self._handle_notification(message)
+                yield message
+                if message.get("id") == request["id"]:
+                    if record is not None and _is_error_response(message):
+                        record.error = True
+                    return
+
+    async def call_tools(self, calls: Iterable[Tuple[str, dict]]) -> List[dict]:
+        """
+        Executa várias ferramentas em uma ida e volta, devolvendo as respostas na
+        ordem das chamadas. Envia um lote JSON-RPC quando o servidor aceita e,
+        caso contrário, dispara as requisições em paralelo na mesma conexão.
+        """
+        await self._ensure_initialized()
+        calls = [(tool_name, arguments or {}) for tool_name, arguments in calls]
+
+        requests = [
+            self._build_call_tool_data(tool_name, **arguments)
+            for tool_name, arguments in calls
+        ]
+        if not requests:
+            return []
+
+        if self.batch_supported is not False:
+            session_id = self.mcp_session_id
+            try:
+                responses = await self._post_batch(requests)
+            except SessionExpiredError:
+                await self._reinitialize(session_id)
+                responses = await self._post_batch(requests)
+            if responses is not None:
+                self.batch_supported = True
+                return responses
+            self.batch_supported = False
+
+        return await asyncio.gather(
+            *(self._call_with_policy(tool_name, arguments) for tool_name, arguments in calls)
+        )
+
+    async def _post_request(self, request: dict) -> dict:
+        tool = request["params"].get("name", "")
+        async with self._post(request, request["method"], tool) as (response, record):
+            self._check_status(response)
+            # Notificações que chegam antes da resposta são tratadas e descartadas sem acumular o corpo
+            async for message in iter_response_messages(response):
+                if "method" in message:
+                    self._handle_notification(message)
+                elif message.get("id") == request["id"]:
+                    if record is not None and _is_error_response(message):
+                        record.error = True
+                    return message
+            if record is not None:
+                record.error = True
+        raise RuntimeError(f"No response for JSON-RPC request id: {request['id']}")
+
+    async def _post_batch(self, requests: List[dict]) -> Optional[List[dict]]:
+        async with self._post(requests, "tools/call", "<batch>") as (response, _):
+            self._check_status(response)
+            if response.status >= 400:
+                return None
+            messages = []
+            async for message in iter_response_messages(response):
+                if "method" in message:
+                    self._handle_notification(message)
+                else:
+                    messages.append(message)
+
+        # Lote recusado: erro HTTP ou erro JSON-RPC sem id, sem nenhuma resposta correlacionável
+        if not any(message.get("id") is not None for message in messages):
+            return None
+        return self._demultiplex(requests, messages)
+
+    def _check_status(self, response: aiohttp.ClientResponse):
+        # Vale a sessão enviada nesta requisição: a atual pode já ter sido trocada por outra chamada
+        session_id = response.request_info.headers.get("MCP-Session-ID")
+        if response.status == 404 and session_id:
+            raise SessionExpiredError(f"MCP session expired: {session_id}")
+        if response.status in RETRYABLE_STATUSES:
+            response.raise_for_status()
+
+    @staticmethod
+    def _demultiplex(requests: List[dict], messages: List[dict]) -> List[dict]:
+        by_id = {message["id"]: message for message in messages if message.get("id") is not None}
+        missing = [request["id"] for request in requests if request["id"] not in by_id]
+        if missing:
+            raise RuntimeError(f"No response for JSON-RPC request ids: {missing}")
+        return [by_id[request["id"]] for request in requests]
+
+
+class MCPClientPool:
+    """
+    Pool de sessões MCP já inicializadas sobre uma única ClientSession.
+
+    O handshake initialize é feito uma vez por sessão no start(); depois disso
+    as chamadas são distribuídas em round-robin entre as sessões, com no
+    máximo max_concurrency chamadas em andamento ao mesmo tempo.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        size: int = 4,
+        max_concurrency: int = 64,
+        limit: int = DEFAULT_CONNECTION_LIMIT,
+        limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+        keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+        response_cache: Optional[ToolResponseCache] = None,
+        metrics: Optional[ClientMetrics] = None,
+        timeout: Optional[float] = None,
+        timeouts: Optional[Dict[str, float]] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        tool_catalog: Optional[ToolCatalogCache] = None,
+    ):
+        self.url = url
+        self.size = size
+        # Compartilhado entre as sessões do pool, inclusive o single-flight
+        self.response_cache = response_cache
+        self.metrics = metrics
+        self._client_options = {"timeout": timeout, "timeouts": timeouts, "retry_policy": retry_policy}
+        # Um catálogo só para todas as sessões, já que todas falam com o mesmo servidor
+        self.tool_catalog = tool_catalog if tool_catalog is not None else ToolCatalogCache()
+        self.max_concurrency = max_concurrency
+        self._connector_options = {
+            "limit": limit,
+            "limit_per_host": limit_per_host,
+            "keepalive_timeout": keepalive_timeout,
+        }
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.clients: List[MCPClient] = []
+        self._next_client = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def start(self):
+        if not self.session:
+            trace_configs = [self.metrics.trace_config()] if self.metrics is not None else None
+            self.session = build_http_session(trace_configs=trace_configs, **self._connector_options)
+        self.clients = [
+            MCPClient(
+                self.url, session=self.session, response_cache=self.response_cache, metrics=self.metrics,
+                tool_catalog=self.tool_catalog, **self._client_options,
+            )
+            for _ in range(self.size)
+        ]
+        try:
+            await asyncio.gather(*(client.initialize() for client in self.clients))
+        except BaseException:
+            # __aexit__ não roda quando o __aenter__ falha
+            await self.close()
+            raise
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+        self.session = None
+        self.clients = []
+
+    def _pick_client(self) -> MCPClient:
+        if not self.clients:
+            raise RuntimeError("Pool not started. Call start() first.")
+        client = self.clients[self._next_client % len(self.clients)]
+        self._next_client += 1
+        return client
+
+    async def call_tool(self, tool_name: str, **kwargs) -> dict:
+        async with self._semaphore:
+            return await self._pick_client().call_tool(tool_name, **kwargs)
+
+    async def call_tools(self, calls: Iterable[Tuple[str, dict]]) -> List[dict]:
+        async with self._semaphore:
+            return await self._pick_client().call_tools(calls)
+
+    async def tools(self) -> EnrichedCatalog:
+        return await self._pick_client().tools()
+
+    async def gather_tools(
+        self, calls: Iterable[Tuple[str, dict]], return_exceptions: bool = False
+    ) -> List[Any]:
+        # Dispara todas as chamadas de uma vez; o semáforo limita quantas rodam juntas
+        return await asyncio.gather(
+            *(self.call_tool(tool_name, **(arguments or {})) for tool_name, arguments in calls),
+            return_exceptions=return_exceptions,
+        )
+
+
+class SyncMCPClient:
+    """
+    Fachada síncrona e thread-safe sobre o MCPClientPool: um único event loop
+    roda numa thread de fundo durante toda a vida do cliente, então as
+    chamadas bloqueantes reaproveitam sessões MCP e conexões em vez de criar
+    um loop e uma ClientSession por chamada (como faz asyncio.run).
+
+        with SyncMCPClient("http://127.0.0.1:8000/mcp") as client:
+            client.call_tool("get_pokemon", offset=0, limit=5)
+            client.map("get_pokemon", [{"offset": i, "limit": 5} for i in range(0, 50, 5)])
+
+    Os argumentos extras vão para o MCPClientPool.
+    """
+
+    def __init__(self, url: str, **pool_options: Any):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="mcp-client-loop", daemon=True)
+        self._thread.start()
+        self._closed = False
+
+        async def start() -> MCPClientPool:
+            # O pool (e o seu semáforo) precisa nascer dentro do loop que vai usá-lo
+            pool = MCPClientPool(url, **pool_options)
+            await pool.start()
+            return pool
+
+        try:
+            self.pool: MCPClientPool = self._run(start())
+        except BaseException:
+            self._stop_loop()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _run(self, coro: Awaitable[Any]) -> Any:
+        if self._closed:
+            coro.close()
+            raise RuntimeError("SyncMCPClient is closed")
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("SyncMCPClient cannot be called from its own event loop")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def call_tool(self, tool_name: str, **kwargs) -> dict:
+        return self._run(self.pool.call_tool(tool_name, **kwargs))
+
+    def call_tools(self, calls: Iterable[Tuple[str, dict]]) -> List[dict]:
+        return self._run(self.pool.call_tools(list(calls)))
+
+    def tools(self) -> EnrichedCatalog:
+        return self._run(self.pool.tools())
+
+    def map(
+        self, tool_name: str, arguments: Iterable[dict], return_exceptions: bool = False
+    ) -> List[Any]:
+        """Chama tool_name uma vez por conjunto de argumentos, em paralelo, mantendo a ordem"""
+        calls = [(tool_name, kwargs) for kwargs in arguments]
+        return self._run(self.pool.gather_tools(calls, return_exceptions=return_exceptions))
+
+    def close(self):
+        if self._closed:
+            return
+        try:
+            self._run(self.pool.close())
+        finally:
+            self._closed = True
+            self._stop_loop()
+
+    def _stop_loop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
 
-        return self._parse_response_data(data)
 
 async def main():
     async with MCPClient("http://127.0.0.1:8000/mcp") as client:
-        await client.initialize()
+        data = await client.initialize()
+        print("Resposta de inicialização:", data)
+        print("=" * 40)
         result = await client.call_tool("get_pokemon", **{"offset": 5, "limit": 5})
         print(result)
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
@@ -0,0 +1,510 @@
+"""
+Teste de carga de servidores MCP usando MCPClient.
+
+Suporta carga em malha fechada (N workers chamando em sequência) e em malha
+aberta (chegadas de Poisson a uma taxa fixa, com a latência medida a partir
+do instante agendado, para não esconder fila), mix ponderado de ferramentas e
+relatório de vazão, latência p50/p95/p99/max e erros por tipo. Com --stub
+sobe um servidor MCP local, sem rede, para comparar execuções.
+
+    python mcp_loadtest.py --stub --mode closed --concurrency 32 --duration 10
+    python mcp_loadtest.py --url http://127.0.0.1:8000/mcp --mode open --rate 200
+    python mcp_loadtest.py --stub -o base.json
+    python mcp_loadtest.py --stub --compare base.json
+    python mcp_loadtest.py --stub --stub-expire-every 0.5 --duration 3
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import random
+import sys
+import uuid
+
+import aiohttp
+from aiohttp import web
+
+from mcp_client import MCPClientPool
+
+
+def _stub_get_pokemon(arguments: dict) -> dict:
+    offset = int(arguments.get("offset", 0))
+    limit = int(arguments.get("limit", 20))
+    return {
+        "count": 1302,
+        "results": [
+            {"name": f"pokemon-{i}", "url": f"https://pokeapi.co/api/v2/pokemon/{i + 1}/"}
+            for i in range(offset, offset + limit)
+        ],
+    }
+
+
+def _stub_echo(arguments: dict) -> dict:
+    return dict(arguments)
+
+
+STUB_TOOL_SCHEMAS: Dict[str, dict] = {
+    "get_pokemon": {
+        "type": "object",
+        "properties": {"offset": {"type": "integer"}, "limit": {"type": "integer"}},
+        "required": ["offset", "limit"],
+    },
+    "echo": {
+        "type": "object",
+        "properties": {"text": {"type": "string", "description": "Texto devolvido como veio"}},
+        "required": ["text"],
+    },
+}
+
+
+class StubMCPServer:
+    """
+    Servidor MCP mínimo em aiohttp para testes locais: responde initialize,
+    notificações, tools/list e tools/call (em SSE, como o FastMCP, ou JSON), com latência
+    simulada e uma fração configurável de erros de ferramenta. Como o
+    transporte Streamable HTTP, responde 404 a qualquer MCP-Session-ID
+    desconhecido, inclusive no initialize, e 400 a pedidos sem sessão. Com
+    expire_every > 0 todas as sessões expiram a cada expire_every segundos,
+    como num servidor reiniciado, e os clientes precisam reinicializar.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        sse: bool = True,
+        seed: Optional[int] = None,
+        expire_every: float = 0.0,
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.sse = sse
+        self.tools: Dict[str, Callable[[dict], dict]] = {
+            "get_pokemon": _stub_get_pokemon,
+            "echo": _stub_echo,
+        }
+        self.sessions: set = set()
+        self.expire_every = expire_every
+        self.expirations = 0
+        self._rng = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+        self._expirer: Optional[asyncio.Task] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/mcp"
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/mcp", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Com port=0 o sistema escolhe uma porta livre
+        self.port = self._runner.addresses[0][1]
+        if self.expire_every > 0:
+            self._expirer = asyncio.ensure_future(self._expire_periodically())
+        return self.url
+
+    def expire_sessions(self):
+        """Esquece todas as sessões; os próximos pedidos delas recebem 404"""
+        self.sessions.clear()
+        self.expirations += 1
+
+    async def _expire_periodically(self):
+        while True:
+            await asyncio.sleep(self.expire_every)
+            self.expire_sessions()
+
+    async def close(self):
+        if self._expirer is not None:
+            self._expirer.cancel()
+            self._expirer = None
+        if self._runner:
+            await self._runner.cleanup()
+        self._runner = None
+
+    def _respond(self, message: dict, headers: Optional[dict] = None) -> web.Response:
+        if self.sse:
+            body = f"event: message\ndata: {json.dumps(message)}\n\n"
+            return web.Response(text=body, content_type="text/event-stream", headers=headers)
+        return web.json_response(message, headers=headers)
+
+    @staticmethod
+    def _error(request_id: Any, code: int, message: str, status: int) -> web.Response:
+        return web.json_response(
+            {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}},
+            status=status,
+        )
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        try:
+            message = await request.json()
+        except ValueError:
+            return self._error(None, -32700, "Parse error", 400)
+        if not isinstance(message, dict):
+            return self._error(None, -32600, "Batch requests are not supported", 400)
+
+        method = message.get("method")
+        request_id = message.get("id")
+        session_id = request.headers.get("mcp-session-id")
+        if session_id is not None and session_id not in self.sessions:
+            return self._error(request_id, -32001, "Session not found", 404)
+        if method == "initialize":
+            session_id = uuid.uuid4().hex
+            self.sessions.add(session_id)
+            result = {
+                "protocolVersion": message.get("params", {}).get("protocolVersion", "2025-03-26"),
+                "capabilities": {"tools": {"listChanged": True}},
+                "serverInfo": {"name": "stub-mcp", "version": "0.0.1"},
+            }
+            return self._respond(
+                {"jsonrpc": "2.0", "id": request_id, "result": result},
+                headers={"mcp-session-id": session_id},
+            )
+
+        if session_id is None:
+            return self._error(request_id, -32000, "Bad Request: Missing session ID", 400)
+        if request_id is None:
+            # Notificação: nada a responder
+            return web.Response(status=202)
+        if method == "tools/list":
+            tools = [
+                {
+                    "name": name,
+                    "description": f"Ferramenta {name} do stub",
+                    "inputSchema": STUB_TOOL_SCHEMAS.get(name, {"type": "object", "properties": {}}),
+                }
+                for name in self.tools
+            ]
+            return self._respond({"jsonrpc": "2.0", "id": request_id, "result": {"tools": tools}})
+        if method != "tools/call":
+            return self._error(request_id, -32601, f"Method not found: {method}", 200)
+
+        params = message.get("params", {})
+        tool = self.tools.get(params.get("name"))
+        if tool is None:
+            return self._error(request_id, -32602, f"Unknown tool: {params.get('name')}", 200)
+
+        delay = self.latency + self._rng.uniform(0, self.jitter) if self.jitter else self.latency
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self.error_rate and self._rng.random() < self.error_rate:
+            result = {"content": [{"type": "text", "text": "simulated failure"}], "isError": True}
+        else:
+            data = tool(params.get("arguments") or {})
+            result = {
+                "content": [{"type": "text", "text": json.dumps(data)}],
+                "structuredContent": data,
+                "isError": False,
+            }
+        return self._respond({"jsonrpc": "2.0", "id": request_id, "result": result})
+
+
+def parse_tool_mix(spec: str) -> List[Tuple[str, float]]:
+    """'get_pokemon=3,echo=1' -> [('get_pokemon', 3.0), ('echo', 1.0)]"""
+    mix = []
+    for item in spec.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name:
+            mix.append((name, float(weight) if weight else 1.0))
+    if not mix:
+        raise ValueError(f"Empty tool mix: {spec!r}")
+    return mix
+
+
+DEFAULT_ARGUMENTS: Dict[str, dict] = {
+    "get_pokemon": {"offset": 0, "limit": 20},
+    "echo": {"text": "ping"},
+}
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _error_kind(response: dict) -> Optional[str]:
+    if "error" in response:
+        return f"jsonrpc:{response['error'].get('code')}"
+    result = response.get("result")
+    if not isinstance(result, dict):
+        return "invalid_response"
+    if result.get("isError"):
+        return "tool_error"
+    return None
+
+
+class LoadStats:
+    """Latências (segundos) e erros por ferramenta acumulados durante a execução"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, Dict[str, int]] = {}
+
+    def record(self, tool: str, seconds: float, error: Optional[str]):
+        self.latencies.setdefault(tool, []).append(seconds)
+        if error is not None:
+            by_kind = self.errors.setdefault(tool, {})
+            by_kind[error] = by_kind.get(error, 0) + 1
+
+    @staticmethod
+    def _summarize(latencies: List[float], errors: Dict[str, int]) -> Dict[str, Any]:
+        latencies = sorted(latencies)
+        return {
+            "requests": len(latencies),
+            "errors": sum(errors.values()),
+            "errors_by_kind": dict(sorted(errors.items())),
+            "p50_ms": _percentile(latencies, 0.50) * 1e3,
+            "p95_ms": _percentile(latencies, 0.95) * 1e3,
+            "p99_ms": _percentile(latencies, 0.99) * 1e3,
+            "max_ms": (latencies[-1] if latencies else 0.0) * 1e3,
+        }
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        all_latencies = [seconds for values in self.latencies.values() for seconds in values]
+        all_errors: Dict[str, int] = {}
+        for by_kind in self.errors.values():
+            for kind, count in by_kind.items():
+                all_errors[kind] = all_errors.get(kind, 0) + count
+
+        total = self._summarize(all_latencies, all_errors)
+        total["throughput_rps"] = len(all_latencies) / elapsed if elapsed else 0.0
+        total["elapsed_s"] = elapsed
+        total["tools"] = {
+            tool: self._summarize(latencies, self.errors.get(tool, {}))
+            for tool, latencies in sorted(self.latencies.items())
+        }
+        return total
+
+
+async def _timed_call(
+    pool: MCPClientPool, tool: str, arguments: dict, started: float, stats: LoadStats
+):
+    loop = asyncio.get_running_loop()
+    try:
+        response = await pool.call_tool(tool, **arguments)
+        error = _error_kind(response)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        error = type(e).__name__
+    stats.record(tool, loop.time() - started, error)
+
+
+async def _closed_loop(
+    pool: MCPClientPool, choose: Callable[[], Tuple[str, dict]], concurrency: int, duration: float,
+    stats: LoadStats,
+):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+
+    async def worker():
+        while loop.time() < deadline:
+            tool, arguments = choose()
+            await _timed_call(pool, tool, arguments, loop.time(), stats)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def _open_loop(
+    pool: MCPClientPool, choose: Callable[[], Tuple[str, dict]], rate: float, duration: float,
+    stats: LoadStats, rng: random.Random,
+):
+    # A latência conta a partir do instante agendado: se o servidor (ou o
+    # limite de concorrência do pool) atrasar, a fila aparece no resultado
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    scheduled = started
+    tasks = set()
+    while scheduled < started + duration:
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tool, arguments = choose()
+        task = asyncio.create_task(_timed_call(pool, tool, arguments, scheduled, stats))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        scheduled += rng.expovariate(rate)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+async def run_load(
+    url: str,
+    mode: str = "closed",
+    concurrency: int = 16,
+    rate: float = 100.0,
+    duration: float = 10.0,
+    mix: Optional[List[Tuple[str, float]]] = None,
+    arguments: Optional[Dict[str, dict]] = None,
+    sessions: int = 4,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Executa a carga contra url e devolve o resumo. No modo closed,
+    concurrency workers chamam em sequência durante duration segundos; no
+    modo open, chegam rate requisições por segundo e concurrency limita
+    quantas ficam em andamento (o excesso espera e conta na latência).
+    """
+    if mode not in ("closed", "open"):
+        raise ValueError(f"Unknown mode: {mode!r}")
+
+    mix = mix or [("get_pokemon", 1.0)]
+    arguments = {**DEFAULT_ARGUMENTS, **(arguments or {})}
+    rng = random.Random(seed)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+
+    def choose() -> Tuple[str, dict]:
+        tool = rng.choices(names, weights)[0]
+        return tool, arguments.get(tool, {})
+
+    stats = LoadStats()
+    async with MCPClientPool(
+        url, size=sessions, max_concurrency=concurrency,
+        limit=max(concurrency, sessions), limit_per_host=max(concurrency, sessions),
+    ) as pool:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        if mode == "closed":
+            await _closed_loop(pool, choose, concurrency, duration, stats)
+        else:
+            await _open_loop(pool, choose, rate, duration, stats, rng)
+        elapsed = loop.time() - started
+        reinitializations = sum(client.reinitializations for client in pool.clients)
+
+    summary = stats.summary(elapsed)
+    summary["reinitializations"] = reinitializations
+    summary["config"] = {
+        "url": url,
+        "mode": mode,
+        "concurrency": concurrency,
+        "rate": rate if mode == "open" else None,
+        "duration": duration,
+        "mix": dict(mix),
+        "sessions": sessions,
+        "seed": seed,
+    }
+    return summary
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    lines = [
+        f"{summary['requests']} requisições em {summary['elapsed_s']:.2f}s "
+        f"({summary['throughput_rps']:.1f} req/s), {summary['errors']} erros, "
+        f"{summary.get('reinitializations', 0)} reinicializações de sessão",
+        f"latência ms: p50={summary['p50_ms']:.2f} p95={summary['p95_ms']:.2f} "
+        f"p99={summary['p99_ms']:.2f} max={summary['max_ms']:.2f}",
+    ]
+    for tool, stats in summary["tools"].items():
+        lines.append(
+            f"    {tool}: {stats['requests']} req, {stats['errors']} erros, "
+            f"p50={stats['p50_ms']:.2f} p99={stats['p99_ms']:.2f} max={stats['max_ms']:.2f}"
+        )
+    for kind, count in summary["errors_by_kind"].items():
+        lines.append(f"    erro {kind}: {count}")
+    return "\n".join(lines)
+
+
+def compare_summaries(previous: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.10) -> List[str]:
+    """Lista as regressões de vazão e p99 além da tolerância em relação ao baseline"""
+    regressions = []
+    if previous["throughput_rps"] and current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+        regressions.append(
+            f"vazão {current['throughput_rps']:.1f} req/s contra {previous['throughput_rps']:.1f} no baseline"
+        )
+    if previous["p99_ms"] and current["p99_ms"] > previous["p99_ms"] * (1 + tolerance):
+        regressions.append(f"p99 {current['p99_ms']:.2f}ms contra {previous['p99_ms']:.2f}ms no baseline")
+    if current["requests"] and previous["requests"]:
+        previous_rate = previous["errors"] / previous["requests"]
+        current_rate = current["errors"] / current["requests"]
+        if current_rate > previous_rate + tolerance / 10:
+            regressions.append(f"taxa de erro {current_rate:.2%} contra {previous_rate:.2%} no baseline")
+    return regressions
+
+
+async def _run_from_args(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = parse_tool_mix(args.mix)
+    arguments = json.loads(args.arguments) if args.arguments else None
+    options = dict(
+        mode=args.mode, concurrency=args.concurrency, rate=args.rate, duration=args.duration,
+        mix=mix, arguments=arguments, sessions=args.sessions, seed=args.seed,
+    )
+    if not args.stub:
+        return await run_load(args.url, **options)
+
+    async with StubMCPServer(
+        latency=args.stub_latency, jitter=args.stub_jitter, error_rate=args.stub_error_rate, seed=args.seed,
+        expire_every=args.stub_expire_every,
+    ) as server:
+        summary = await run_load(server.url, **options)
+    if args.stub_expire_every > 0 and server.expirations and not summary["reinitializations"]:
+        # As sessões expiraram e ninguém reinicializou: os clientes não se recuperam
+        raise RuntimeError(f"{server.expirations} expirações de sessão sem nenhuma reinicialização")
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Teste de carga de servidores MCP")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/mcp")
+    parser.add_argument("--stub", action="store_true", help="sobe um servidor MCP local e ignora --url")
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=100.0, help="req/s no modo open")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--mix", default="get_pokemon=1", help="ferramentas e pesos, ex.: get_pokemon=3,echo=1")
+    parser.add_argument("--arguments", help='JSON com os argumentos por ferramenta, ex.: {"get_pokemon": {"offset": 0, "limit": 5}}')
+    parser.add_argument("--sessions", type=int, default=4, help="sessões MCP no pool")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stub-latency", type=float, default=0.005)
+    parser.add_argument("--stub-jitter", type=float, default=0.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-expire-every", type=float, default=0.0,
+                        help="expira todas as sessões do stub a cada N segundos, testando a reinicialização")
+    parser.add_argument("-o", "--output", help="arquivo JSON onde salvar o resumo")
+    parser.add_argument("--compare", help="resumo JSON anterior para detectar regressões")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    try:
+        summary = asyncio.run(_run_from_args(args))
+    except aiohttp.ClientError as e:
+        print(f"✗ não foi possível conectar em {args.url}: {e}")
+        return 2
+    print(format_summary(summary))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_summaries(json.load(f), summary, args.tolerance)
+        for regression in regressions:
+            print(f"✗ regressão: {regression}")
+        if regressions:
+            return 1
+        print("✓ sem regressões em relação ao baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
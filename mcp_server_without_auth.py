@@ -1,46 +1,1055 @@
+import argparse
+import asyncio
+import hashlib
+import json
 import logging
-import requests
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+import aiohttp
+from aiohttp import web
 
 from fastmcp import Context, FastMCP
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+
+from metrics import LatencyHistogram, prometheus_labels, render_histograms
+from singleflight import SingleFlight
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("my_custom_logger")
 
+class _JsonFields:
+    """Campos de um evento, serializados só quando o logging de fato formata a mensagem"""
+    __slots__ = ("fields",)
+
+    def __init__(self, fields: Dict[str, Any]):
+        self.fields = fields
+
+    def __str__(self) -> str:
+        return json.dumps(self.fields, default=str, separators=(",", ":"))
+
+
 class CustomLogger:
+    def __init__(self, sample_rate: float = 1.0):
+        self.sample_rate = sample_rate
+
     def info(self, *args, **kwargs):
         logger.info(*args, **kwargs)
     
     def error(self, *args, **kwargs):
         logger.error(*args, **kwargs)
 
+    def event(self, name: str, level: int = logging.INFO, **fields: Any):
+        """
+        Log estruturado (nome do evento + campos em JSON) e preguiçoso: nada é
+        formatado se o nível estiver desligado. Abaixo de ERROR só uma fração
+        sample_rate dos eventos é registrada; erros sempre saem.
+        """
+        if not logger.isEnabledFor(level):
+            return
+        if level < logging.ERROR and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        logger.log(level, "%s %s", name, _JsonFields(fields))
+
+
+class UpstreamTimer:
+    """
+    Tempo de relógio de uma chamada de ferramenta com pelo menos uma
+    requisição ao upstream em andamento; buscas em paralelo não somam em dobro.
+    """
+    __slots__ = ("in_flight", "started", "seconds", "requests")
+
+    def __init__(self):
+        self.in_flight = 0
+        self.started = 0.0
+        self.seconds = 0.0
+        self.requests = 0
+
+    def enter(self):
+        if self.in_flight == 0:
+            self.started = time.perf_counter()
+        self.in_flight += 1
+        self.requests += 1
+
+    def exit(self):
+        self.in_flight -= 1
+        if self.in_flight == 0:
+            self.seconds += time.perf_counter() - self.started
+
+
+# Timer da chamada de ferramenta corrente, definido pelo InstrumentationMiddleware
+_upstream_timer: ContextVar[Optional[UpstreamTimer]] = ContextVar("upstream_timer", default=None)
+
+
+@contextmanager
+def _timed_upstream():
+    timer = _upstream_timer.get()
+    if timer is None:
+        yield
+        return
+    timer.enter()
+    try:
+        yield
+    finally:
+        timer.exit()
+
+
+@dataclass
+class CachedResponse:
+    """Corpo JSON do upstream e os metadados para servir do cache e revalidar"""
+    data: Any
+    expires_at: float  # time.time(), para valer também depois de reiniciar
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    size: int = 0  # Bytes do corpo JSON, para limitar o cache por tamanho
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+
+def parse_cache_control(header: Optional[str]) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for item in (header or "").split(","):
+        name, _, value = item.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def response_ttl(headers: Any, default_ttl: float) -> Optional[float]:
+    """Segundos de validade segundo Cache-Control/Age; None quando não pode ser guardado"""
+    directives = parse_cache_control(headers.get("Cache-Control"))
+    if "no-store" in directives or "private" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    # Somos um cache compartilhado entre clientes: s-maxage tem precedência
+    for name in ("s-maxage", "max-age"):
+        value = directives.get(name)
+        if value is not None and value.isdigit():
+            age = headers.get("Age", "0")
+            return max(0.0, float(value) - (float(age) if age.isdigit() else 0.0))
+    return default_ttl
+
+
+class SqliteCacheStore:
+    """
+    Camada em disco do cache: um arquivo SQLite que sobrevive a reinícios.
+    Os métodos são bloqueantes; o ResponseCache os chama via asyncio.to_thread.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL,"
+            " etag TEXT, last_modified TEXT, stored_at REAL NOT NULL)"
+        )
+        self._connection.commit()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data, expires_at, etag, last_modified FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return CachedResponse(json.loads(row[0]), row[1], row[2], row[3], len(row[0]))
+
+    def set(self, key: str, entry: CachedResponse):
+        data = json.dumps(entry.data, separators=(",", ":"))
+        with self._lock:
+            try:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, data, entry.expires_at, entry.etag, entry.last_modified, time.time()),
+                )
+                self._writes += 1
+                if self._writes % 256 == 0:
+                    # Poda periódica: mantém só as max_entries gravadas mais
+                    # recentemente, somando no máximo max_bytes
+                    self._connection.execute(
+                        "DELETE FROM responses WHERE key IN (SELECT key FROM ("
+                        " SELECT key, ROW_NUMBER() OVER recent AS position,"
+                        " SUM(LENGTH(data)) OVER recent AS total FROM responses"
+                        " WINDOW recent AS (ORDER BY stored_at DESC))"
+                        " WHERE position > ? OR total > ?)",
+                        (self.max_entries, self.max_bytes),
+                    )
+                self._connection.commit()
+            except sqlite3.Error:
+                # Não deixa a transação aberta para a próxima escrita
+                self._connection.rollback()
+                raise
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class ResponseCache:
+    """
+    Cache de respostas do upstream em dois níveis: LRU em memória com TTL e,
+    opcionalmente, um SqliteCacheStore em disco. Entradas vencidas continuam
+    guardadas para revalidação condicional (ETag/Last-Modified). A memória é
+    limitada por número de entradas e por bytes (max_bytes), já que um
+    detalhe de pokémon tem centenas de KB; respostas maiores que max_bytes
+    não ficam em memória.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        default_ttl: float = 300,
+        disk: Optional[SqliteCacheStore] = None,
+        max_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self.disk = disk
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.coalesced = 0
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        if self.disk is not None:
+            try:
+                entry = await asyncio.to_thread(self.disk.get, key)
+            except sqlite3.Error as e:
+                # A camada em disco é só otimização: falha nela vira miss
+                logger.warning("Leitura do cache em disco falhou: %s", e)
+                return None
+            if entry is not None:
+                self.disk_hits += 1
+                self._remember(key, entry)
+        return entry
+
+    async def set(self, key: str, entry: CachedResponse):
+        self._remember(key, entry)
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.set, key, entry)
+            except sqlite3.Error as e:
+                # Com workers dividindo o arquivo, "database is locked" acontece:
+                # a resposta já veio do upstream e não deve falhar por isso
+                logger.warning("Escrita no cache em disco falhou: %s", e)
+
+    def _remember(self, key: str, entry: CachedResponse):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous.size
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self.bytes += entry.size
+        while len(self._entries) > self.maxsize or self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "coalesced": self.coalesced,
+            "size": len(self._entries),
+            "bytes": self.bytes,
+        }
+
 
 class PokeApi:
+    """
+    Cliente assíncrono da PokeAPI sobre uma única ClientSession por event
+    loop, criada no primeiro uso: as conexões keep-alive são reaproveitadas entre chamadas,
+    no máximo max_concurrency requisições ficam em andamento ao mesmo tempo
+    e cada uma tem timeout próprio, então um upstream lento não prende o
+    servidor.
+
+    Com cache, GETs são servidos do ResponseCache enquanto frescos e
+    revalidados com If-None-Match/If-Modified-Since quando vencem; misses
+    idênticos concorrentes compartilham uma única ida ao upstream. As
+    respostas devolvidas são compartilhadas com o cache e não devem ser
+    alteradas.
+
+    Ainda com cache, a listagem é buscada em blocos alinhados de block_size:
+    janelas offset/limit sobrepostas ou adjacentes são recortadas dos mesmos
+    blocos guardados, e uma janela que começa onde outra terminou (paginação
+    sequencial) dispara a busca dos próximos prefetch_blocks blocos em
+    segundo plano.
+    """
     url: str = "https://pokeapi.co/api/v2/"
 
-    def __make_request(
+    def __init__(
+        self,
+        max_connections: int = 32,
+        max_concurrency: int = 64,
+        timeout: float = 30,
+        connect_timeout: float = 5,
+        keepalive_timeout: float = 30,
+        cache: Optional[ResponseCache] = None,
+        block_size: int = 100,
+        prefetch_blocks: int = 2,
+        max_merged_blocks: int = 10,
+    ):
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.max_concurrency = max_concurrency
+        # Sessão, semáforo e buscas em andamento pertencem ao loop em _loop (ver _bind_loop)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.cache = cache
+        self._inflight = SingleFlight()
+        self.block_size = block_size
+        self.prefetch_blocks = prefetch_blocks
+        self.max_merged_blocks = max_merged_blocks
+        # Fim das últimas janelas servidas: um pedido que começa num deles é sequencial
+        self._window_ends: "OrderedDict[int, None]" = OrderedDict()
+        self._prefetches: set = set()
+
+    def _bind_loop(self):
+        """
+        A instância do módulo sobrevive ao event loop (dois asyncio.run, um
+        lifespan reiniciado): quando o loop corrente muda, sessão, semáforo e
+        tasks do loop anterior são descartados e recriados neste. A sessão
+        antiga não pode ser fechada daqui, pois pertence ao outro loop.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        self._loop = loop
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._session = None
+        self._inflight = SingleFlight()
+        self._prefetches = set()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout, raise_for_status=True
+            )
+        return self._session
+
+    async def close(self):
+        self._bind_loop()
+        for task in list(self._prefetches):
+            task.cancel()
+        self._inflight.cancel_all()
+        if self._session is not None:
+            await self._session.close()
+        self._session = None
+
+    async def __make_request(
         self, endpoint: str = "pokemon", verb: str = "GET", **kwargs
     ) -> dict:
+        self._bind_loop()
         url: str = f"{self.url}{endpoint}"
-        response: requests.Response = requests.request(verb, url, timeout=30, **kwargs)
-        response.raise_for_status()
-        return response.json()
+        if self.cache is None or verb != "GET":
+            with _timed_upstream():
+                async with self._semaphore:
+                    async with self._get_session().request(verb, url, **kwargs) as response:
+                        return await response.json()
+
+        params = kwargs.get("params") or {}
+        key = hashlib.sha256(
+            f"{url}?{json.dumps(params, sort_keys=True, default=str)}".encode()
+        ).hexdigest()
+        entry = await self.cache.get(key)
+        if entry is not None and entry.is_fresh():
+            self.cache.hits += 1
+            return entry.data
+
+        fetch = partial(self.__fetch, key, url, entry, **kwargs)
+        if key in self._inflight:
+            self.cache.coalesced += 1
+            with _timed_upstream():
+                return await self._inflight.do(key, fetch)
+        # Quem inicia a busca tem o tempo de upstream contado dentro de __fetch
+        return await self._inflight.do(key, fetch)
+
+    async def __fetch(self, key: str, url: str, stale: Optional[CachedResponse], **kwargs) -> Any:
+        headers = dict(kwargs.pop("headers", None) or {})
+        if stale is not None and stale.etag:
+            headers["If-None-Match"] = stale.etag
+        if stale is not None and stale.last_modified:
+            headers["If-Modified-Since"] = stale.last_modified
+
+        with _timed_upstream():
+            async with self._semaphore:
+                async with self._get_session().get(url, headers=headers, **kwargs) as response:
+                    ttl = response_ttl(response.headers, self.cache.default_ttl)
+                    if response.status == 304 and stale is not None:
+                        self.cache.revalidations += 1
+                        data, size = stale.data, stale.size
+                    else:
+                        self.cache.misses += 1
+                        body = await response.read()
+                        data, size = json.loads(body), len(body)
+                    etag = response.headers.get("ETag") or (stale.etag if stale else None)
+                    last_modified = response.headers.get("Last-Modified") or (stale.last_modified if stale else None)
+
+        if ttl is not None:
+            await self.cache.set(key, CachedResponse(data, time.time() + ttl, etag, last_modified, size))
+        return data
+
+    async def get_pokemon(self, offset: int = 20, limit: int = 20) -> dict:
+        first_block = offset // self.block_size if offset >= 0 else 0
+        last_block = (offset + limit - 1) // self.block_size if limit > 0 else first_block
+        if (
+            self.cache is None
+            or offset < 0
+            or limit <= 0
+            or last_block - first_block >= self.max_merged_blocks
+        ):
+            params: dict = {"offset": offset, "limit": limit}
+            return await self.__make_request(endpoint="pokemon", params=params)
+
+        blocks = await asyncio.gather(
+            *(self.__get_block(index) for index in range(first_block, last_block + 1))
+        )
+        count = blocks[0]["count"]
+        results: List[dict] = []
+        for block in blocks:
+            results.extend(block["results"])
+        start = offset - first_block * self.block_size
+        results = results[start:start + limit]
+
+        self.__track_window(offset, limit, last_block, count)
+        return {
+            "count": count,
+            "next": self.__page_url(offset + limit, limit) if offset + limit < count else None,
+            "previous": self.__page_url(max(offset - limit, 0), limit) if offset > 0 else None,
+            "results": results,
+        }
+
+    async def iter_pokemon(self, chunk_size: int = 100) -> AsyncIterator[dict]:
+        """
+        Percorre a listagem inteira em pedaços de chunk_size, no formato
+        {"count", "offset", "results"}, mantendo os próximos blocos já em
+        andamento enquanto o pedaço atual é consumido.
+        """
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size deve ser pelo menos 1, recebido {chunk_size}")
+        pending: List[asyncio.Future] = []
+        next_block = 0
+        count: Optional[int] = None
+        offset = 0
+        buffer: List[dict] = []
+        try:
+            while True:
+                # Até o primeiro bloco chegar não se sabe o total, então só ele é buscado
+                while len(pending) <= self.prefetch_blocks and (
+                    not pending if count is None else next_block * self.block_size < count
+                ):
+                    pending.append(asyncio.ensure_future(self.__get_block(next_block)))
+                    next_block += 1
+                if not pending:
+                    break
+                block = await pending.pop(0)
+                count = block["count"]
+                buffer.extend(block["results"])
+                while len(buffer) >= chunk_size:
+                    yield {"count": count, "offset": offset, "results": buffer[:chunk_size]}
+                    offset += chunk_size
+                    del buffer[:chunk_size]
+            if buffer:
+                yield {"count": count, "offset": offset, "results": buffer}
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def get_pokemon_detail(self, name_or_id: Union[str, int]) -> dict:
+        endpoint = f"pokemon/{quote(str(name_or_id).strip().lower(), safe='')}"
+        return await self.__make_request(endpoint=endpoint)
+
+    async def iter_pokemon_details(
+        self, names: Iterable[Union[str, int]], parallelism: int = 8
+    ) -> AsyncIterator[Tuple[int, dict]]:
+        """
+        Busca os detalhes de vários pokémon com no máximo parallelism
+        requisições em paralelo (limitado a max_connections), entregando
+        (índice, item) na ordem em que terminam. O item é {"name", "data"} ou,
+        se aquele nome falhar, {"name", "error"}, sem interromper os demais.
+        """
+        semaphore = asyncio.Semaphore(max(1, min(parallelism, self.max_connections)))
+
+        async def fetch(index: int, name: Union[str, int]) -> Tuple[int, dict]:
+            async with semaphore:
+                try:
+                    return index, {"name": name, "data": await self.get_pokemon_detail(name)}
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    return index, {"name": name, "error": f"{type(e).__name__}: {e}"}
+
+        tasks = [asyncio.ensure_future(fetch(index, name)) for index, name in enumerate(names)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def __get_block(self, index: int) -> dict:
+        params: dict = {"offset": index * self.block_size, "limit": self.block_size}
+        return await self.__make_request(endpoint="pokemon", params=params)
+
+    def __page_url(self, offset: int, limit: int) -> str:
+        return f"{self.url}pokemon?offset={offset}&limit={limit}"
+
+    def __track_window(self, offset: int, limit: int, last_block: int, count: int):
+        sequential = offset in self._window_ends
+        self._window_ends[offset + limit] = None
+        while len(self._window_ends) > 256:
+            self._window_ends.popitem(last=False)
+        if not sequential:
+            return
+
+        for index in range(last_block + 1, last_block + 1 + self.prefetch_blocks):
+            if index * self.block_size >= count:
+                break
+            task = asyncio.ensure_future(self.__prefetch(index))
+            self._prefetches.add(task)
+            task.add_done_callback(self._prefetches.discard)
+
+    async def __prefetch(self, index: int):
+        # A task herdou o contexto da chamada que a disparou, mas não faz parte dela
+        _upstream_timer.set(None)
+        try:
+            await self.__get_block(index)
+        except Exception as e:
+            logger.error("Prefetch do bloco %s falhou: %s", index, e)
+
+
+def build_response_cache() -> ResponseCache:
+    # POKEMCP_CACHE_PATH liga a camada em disco, que sobrevive a reinícios
+    # POKEMCP_CACHE_MAX_BYTES e POKEMCP_CACHE_DISK_MAX_BYTES limitam memória e disco por tamanho
+    disk_path = os.environ.get("POKEMCP_CACHE_PATH")
+    disk = None
+    if disk_path:
+        try:
+            disk = SqliteCacheStore(
+                disk_path, max_bytes=int(os.environ.get("POKEMCP_CACHE_DISK_MAX_BYTES", 512 * 1024 * 1024))
+            )
+        except sqlite3.Error as e:
+            # Arquivo ilegível ou sem permissão de escrita: segue só com a memória
+            logger.error("Cache em disco %s indisponível, usando só memória: %s", disk_path, e)
+    return ResponseCache(
+        maxsize=int(os.environ.get("POKEMCP_CACHE_SIZE", 1024)),
+        default_ttl=float(os.environ.get("POKEMCP_CACHE_TTL", 300)),
+        disk=disk,
+        max_bytes=int(os.environ.get("POKEMCP_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    )
+
+
+pokemon_service: PokeApi = PokeApi(cache=build_response_cache())
+# POKEMCP_UPSTREAM_URL aponta para outra instância da PokeAPI (um espelho, por exemplo)
+pokemon_service.url = os.environ.get("POKEMCP_UPSTREAM_URL", PokeApi.url)
 
-    def get_pokemon(self, offset: int = 20, limit: int = 20) -> dict:
-        params: dict = {"offset": offset, "limit": limit}
-        return self.__make_request(endpoint="pokemon", params=params)
 
+class ServerMetrics:
+    """
+    Métricas por ferramenta: histogramas de latência total, do upstream e
+    própria (total menos upstream), chamadas, erros, bytes de argumentos e de
+    resposta, requisições ao upstream e chamadas em andamento.
+    """
 
-mcp = FastMCP("PokeMCP", version="0.0.1")
+    PHASES = ("total", "upstream", "own")
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.calls: Dict[str, int] = {}
+        self.errors: Dict[Tuple[str, str], int] = {}
+        self.request_bytes: Dict[str, int] = {}
+        self.response_bytes: Dict[str, int] = {}
+        self.upstream_requests: Dict[str, int] = {}
+        self.in_flight: Dict[str, int] = {}
+
+    def start(self, tool: str):
+        self.in_flight[tool] = self.in_flight.get(tool, 0) + 1
+
+    def finish(
+        self,
+        tool: str,
+        total: float,
+        upstream: UpstreamTimer,
+        error: Optional[str],
+        request_bytes: int,
+        response_bytes: int,
+    ):
+        self.in_flight[tool] -= 1
+        self.calls[tool] = self.calls.get(tool, 0) + 1
+        if error is not None:
+            self.errors[(tool, error)] = self.errors.get((tool, error), 0) + 1
+        self.request_bytes[tool] = self.request_bytes.get(tool, 0) + request_bytes
+        self.response_bytes[tool] = self.response_bytes.get(tool, 0) + response_bytes
+        self.upstream_requests[tool] = self.upstream_requests.get(tool, 0) + upstream.requests
+        for phase, seconds in zip(self.PHASES, (total, upstream.seconds, max(0.0, total - upstream.seconds))):
+            histogram = self.histograms.get((tool, phase))
+            if histogram is None:
+                histogram = self.histograms[(tool, phase)] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def to_prometheus(self, cache: Optional[ResponseCache] = None) -> str:
+        lines = render_histograms("mcp_server_tool_duration_seconds", ("tool", "phase"), self.histograms)
+
+        for name, kind, values in (
+            ("mcp_server_tool_calls_total", "counter", self.calls),
+            ("mcp_server_tool_request_bytes_total", "counter", self.request_bytes),
+            ("mcp_server_tool_response_bytes_total", "counter", self.response_bytes),
+            ("mcp_server_upstream_requests_total", "counter", self.upstream_requests),
+            ("mcp_server_tool_in_flight", "gauge", self.in_flight),
+        ):
+            lines.append(f"# TYPE {name} {kind}")
+            for tool, value in sorted(values.items()):
+                lines.append(f"{name}{prometheus_labels(tool=tool)} {value}")
+
+        lines.append("# TYPE mcp_server_tool_errors_total counter")
+        for (tool, kind), value in sorted(self.errors.items()):
+            lines.append(f"mcp_server_tool_errors_total{prometheus_labels(tool=tool, kind=kind)} {value}")
+
+        if cache is not None:
+            stats = cache.stats()
+            lines.append("# TYPE mcp_server_upstream_cache_events_total counter")
+            for event, value in sorted(stats.items()):
+                if event not in ("size", "bytes"):
+                    lines.append(f"mcp_server_upstream_cache_events_total{prometheus_labels(event=event)} {value}")
+            lines.append("# TYPE mcp_server_upstream_cache_entries gauge")
+            lines.append(f"mcp_server_upstream_cache_entries {stats['size']}")
+            lines.append("# TYPE mcp_server_upstream_cache_bytes gauge")
+            lines.append(f"mcp_server_upstream_cache_bytes {stats['bytes']}")
+        return "\n".join(lines) + "\n"
+
+
+def _result_bytes(result: Any) -> int:
+    # Os blocos de texto já vêm serializados; somá-los evita serializar de novo
+    size = 0
+    for block in getattr(result, "content", None) or []:
+        text = getattr(block, "text", None)
+        if text is not None:
+            size += len(text.encode())
+    return size
+
+
+class InstrumentationMiddleware(Middleware):
+    """Mede cada chamada de ferramenta e registra um evento amostrado no CustomLogger"""
+
+    def __init__(self, metrics: ServerMetrics, log: CustomLogger):
+        self.metrics = metrics
+        self.log = log
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        tool = context.message.name
+        arguments = context.message.arguments or {}
+        timer = UpstreamTimer()
+        token = _upstream_timer.set(timer)
+        self.metrics.start(tool)
+        started = time.perf_counter()
+        result = None
+        error: Optional[str] = None
+        try:
+            result = await call_next(context)
+            if getattr(result, "is_error", False):
+                error = "tool_error"
+            return result
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            total = time.perf_counter() - started
+            _upstream_timer.reset(token)
+            request_bytes = len(json.dumps(arguments, default=str).encode())
+            response_bytes = _result_bytes(result)
+            self.metrics.finish(tool, total, timer, error, request_bytes, response_bytes)
+            self.log.event(
+                "tool_call",
+                level=logging.ERROR if error is not None else logging.INFO,
+                tool=tool,
+                duration_ms=round(total * 1e3, 3),
+                upstream_ms=round(timer.seconds * 1e3, 3),
+                upstream_requests=timer.requests,
+                request_bytes=request_bytes,
+                response_bytes=response_bytes,
+                error=error,
+            )
+
+
+server_metrics = ServerMetrics()
+# POKEMCP_LOG_SAMPLE_RATE: fração das chamadas bem-sucedidas registradas no log
+custom_logger = CustomLogger(sample_rate=float(os.environ.get("POKEMCP_LOG_SAMPLE_RATE", 0.1)))
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    try:
+        yield
+    finally:
+        await pokemon_service.close()
+
+
+mcp = FastMCP(
+    "PokeMCP",
+    version="0.0.1",
+    lifespan=lifespan,
+    middleware=[InstrumentationMiddleware(server_metrics, custom_logger)],
+)
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(
+        server_metrics.to_prometheus(pokemon_service.cache),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+@mcp.tool()
+async def get_pokemon(offset: int, limit: int) -> dict:
+    return await pokemon_service.get_pokemon(offset=offset, limit=limit)
+
+
+@mcp.tool()
+async def stream_pokemon(ctx: Context, chunk_size: int = 100) -> dict:
+    """
+    Listagem completa, buscada em pedaços de chunk_size com os próximos
+    blocos já em andamento. Os itens vêm no resultado, {"count", "results"};
+    quando o cliente manda um progressToken (por exemplo
+    MCPClient.stream_tool(..., progress_token=...)), cada pedaço concluído
+    gera uma notifications/progress com o andamento em texto.
+    """
+    results: List[dict] = []
+    async for chunk in pokemon_service.iter_pokemon(chunk_size=chunk_size):
+        results.extend(chunk["results"])
+        await ctx.report_progress(
+            len(results), total=chunk["count"], message=f"{len(results)} de {chunk['count']} pokémon"
+        )
+    return {"count": len(results), "results": results}
+
+
+# Teto de pokémon por chamada de get_pokemon_details (names ou limit)
+MAX_DETAIL_NAMES = 100
 
 
 @mcp.tool()
-def get_pokemon(offset: int, limit: int, ctx: Context) -> dict:
-    logging.info(f"Getting pokemon with offset={offset} and limit={limit}")
-    logging.info(f"Context: {ctx}")
-    pokemon_service: PokeApi = PokeApi()
-    return pokemon_service.get_pokemon(offset=offset, limit=limit)
+async def get_pokemon_details(
+    ctx: Context,
+    names: Optional[List[Union[str, int]]] = None,
+    offset: int = 0,
+    limit: int = 20,
+    parallelism: int = 8,
+    fields: Optional[List[str]] = None,
+) -> dict:
+    """
+    Detalhes de vários pokémon numa só chamada: pelos nomes/ids em names ou,
+    sem names, pela página offset/limit da listagem. As buscas rodam em
+    paralelo (até parallelism) e cada item concluído gera uma
+    notifications/progress em texto quando o cliente manda um progressToken. Falhas
+    de um item aparecem como {"name", "error"} no resultado, sem derrubar o
+    lote. fields restringe os campos devolvidos de cada pokémon. Cada chamada
+    aceita no máximo MAX_DETAIL_NAMES pokémon.
+    """
+    requested = len(names) if names is not None else limit
+    if requested > MAX_DETAIL_NAMES:
+        raise ValueError(f"No máximo {MAX_DETAIL_NAMES} pokémon por chamada, pedidos {requested}")
+    if names is None:
+        page = await pokemon_service.get_pokemon(offset=offset, limit=limit)
+        names = [item["name"] for item in page["results"]]
+
+    items: List[Optional[dict]] = [None] * len(names)
+    done, errors = 0, 0
+    async for index, item in pokemon_service.iter_pokemon_details(names, parallelism=parallelism):
+        if fields and "data" in item:
+            item = {"name": item["name"], "data": {key: item["data"][key] for key in fields if key in item["data"]}}
+        items[index] = item
+        done += 1
+        errors += "error" in item
+        status = "erro" if "error" in item else "ok"
+        await ctx.report_progress(done, total=len(names), message=f"{item['name']}: {status}")
+    return {"results": items, "errors": errors}
+
+
+# Cabeçalhos que valem só para uma conexão e não devem ser repassados pelo roteador
+HOP_BY_HOP_HEADERS = frozenset({
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade", "host", "content-length",
+})
+
+
+def _forwardable(headers: Any) -> Dict[str, str]:
+    return {name: value for name, value in headers.items() if name.lower() not in HOP_BY_HOP_HEADERS}
+
+
+def merge_prometheus(texts: List[str], label: str = "worker") -> str:
+    """
+    Junta as métricas de vários workers num único texto Prometheus: cada
+    família aparece uma vez e cada amostra ganha o label com o índice do worker.
+    """
+    families: "OrderedDict[str, Tuple[str, List[str]]]" = OrderedDict()
+    for index, text in enumerate(texts):
+        family = None
+        for line in text.splitlines():
+            if line.startswith("# TYPE "):
+                _, _, name, kind = line.split(" ", 3)
+                family = families.setdefault(name, (kind, []))
+                continue
+            if not line or line.startswith("#") or family is None:
+                continue
+            name, brace, rest = line.partition("{")
+            if brace:
+                line = f'{name}{{{label}="{index}",{rest}'
+            else:
+                name, _, value = line.partition(" ")
+                line = f'{name}{{{label}="{index}"}} {value}'
+            family[1].append(line)
+
+    lines = []
+    for name, (kind, samples) in families.items():
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+class SessionAffinityRouter:
+    """
+    Roteador HTTP na frente dos workers. Requisições sem MCP-Session-ID
+    (initialize) são distribuídas em round-robin e o MCP-Session-ID da
+    resposta fica associado ao worker que o criou; as seguintes com esse
+    cabeçalho vão sempre para ele. Respostas SSE são repassadas em stream.
+
+    Limite: o roteador é um único processo e todo byte de requisição e de
+    resposta passa por ele, então a vazão total fica presa a um núcleo. Os
+    workers escalam o trabalho das ferramentas (upstream, JSON), não o
+    repasse HTTP; para respostas grandes o roteador tende a ser o gargalo.
+    """
+
+    def __init__(self, backends: List[str], max_sessions: int = 100_000):
+        self.backends = backends
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, int]" = OrderedDict()
+        self._next_backend = 0
+        self._http: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(limit=0, keepalive_timeout=30)
+        # Sem descompressão: o corpo é repassado com o Content-Encoding original
+        self._http = aiohttp.ClientSession(
+            connector=connector,
+            auto_decompress=False,
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=5),
+        )
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.close()
+
+    def forget_backend(self, index: int):
+        """Esquece as sessões de um worker que morreu; os clientes recebem 404 e reinicializam"""
+        for session_id in [key for key, value in self.sessions.items() if value == index]:
+            del self.sessions[session_id]
+
+    def _pick_backend(self, session_id: Optional[str]) -> int:
+        if session_id:
+            index = self.sessions.get(session_id)
+            if index is not None:
+                self.sessions.move_to_end(session_id)
+                return index
+            # Sessão desconhecida (por exemplo, depois de reiniciar o roteador):
+            # escolha estável; se o worker não a conhecer, o cliente reinicializa
+            return zlib.crc32(session_id.encode()) % len(self.backends)
+        index = self._next_backend % len(self.backends)
+        self._next_backend += 1
+        return index
+
+    def _remember(self, session_id: str, index: int):
+        self.sessions[session_id] = index
+        self.sessions.move_to_end(session_id)
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        session_id = request.headers.get("mcp-session-id")
+        index = self._pick_backend(session_id)
+        body = await request.read()
+        try:
+            upstream = await self._http.request(
+                request.method,
+                self.backends[index] + request.path_qs,
+                headers=_forwardable(request.headers),
+                data=body,
+            )
+        except aiohttp.ClientError as e:
+            logger.error("Worker %s indisponível: %s", index, e)
+            return web.Response(status=502, text="Bad Gateway")
+
+        async with upstream:
+            new_session_id = upstream.headers.get("mcp-session-id")
+            if new_session_id and new_session_id != session_id:
+                self._remember(new_session_id, index)
+            if request.method == "DELETE" and session_id and upstream.status < 300:
+                self.sessions.pop(session_id, None)
+
+            response = web.StreamResponse(status=upstream.status, headers=_forwardable(upstream.headers))
+            await response.prepare(request)
+            try:
+                async for chunk in upstream.content.iter_any():
+                    await response.write(chunk)
+                await response.write_eof()
+            except ConnectionResetError:
+                # Cliente fechou a conexão antes do fim do stream (já tinha a resposta que queria)
+                pass
+            return response
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        async def fetch(backend: str) -> str:
+            try:
+                async with self._http.get(backend + "/metrics") as response:
+                    return await response.text()
+            except aiohttp.ClientError:
+                return ""
+
+        texts = await asyncio.gather(*(fetch(backend) for backend in self.backends))
+        return web.Response(text=merge_prometheus(list(texts)), content_type="text/plain")
+
+
+def _run_worker(host: str, port: int):
+    mcp.run(transport="http", host=host, port=port, show_banner=False)
+
+
+def serve_multiworker(workers: int, host: str = "127.0.0.1", port: int = 8000):
+    """
+    Modo de produção com vários processos: workers pré-criados (spawn) servem
+    o FastMCP em portas internas port+1..port+workers e um
+    SessionAffinityRouter atende em port (veja o limite de vazão dele). Os
+    workers compartilham a camada em disco do cache de respostas
+    (POKEMCP_CACHE_PATH ou, sem ela, um arquivo SQLite num diretório privado
+    criado com mkdtemp e apagado na saída). Workers que morrem são recriados,
+    com espera crescente quando morrem logo depois de subir.
+    """
+    private_cache_dir = None
+    if not os.environ.get("POKEMCP_CACHE_PATH"):
+        # Diretório 0700 do supervisor: outro usuário não consegue criar nem envenenar o arquivo
+        private_cache_dir = tempfile.mkdtemp(prefix="pokemcp-cache-")
+        # Herdado pelos workers, que montam o ResponseCache a partir do ambiente
+        os.environ["POKEMCP_CACHE_PATH"] = os.path.join(private_cache_dir, "responses.sqlite")
+
+    context = multiprocessing.get_context("spawn")
+    worker_ports = [port + 1 + index for index in range(workers)]
+    processes: List[Optional[multiprocessing.Process]] = [None] * workers
+    started_at = [0.0] * workers
+    restart_delay = [1.0] * workers
+    restart_after = [0.0] * workers
+
+    def start_worker(index: int):
+        process = context.Process(target=_run_worker, args=("127.0.0.1", worker_ports[index]), daemon=True)
+        process.start()
+        processes[index] = process
+        started_at[index] = time.monotonic()
+
+    router = SessionAffinityRouter([f"http://127.0.0.1:{worker_port}" for worker_port in worker_ports])
+
+    async def supervise():
+        while True:
+            await asyncio.sleep(1)
+            now = time.monotonic()
+            for index, process in enumerate(processes):
+                if process is None or process.is_alive() or now < restart_after[index]:
+                    continue
+                if restart_after[index] == 0.0:
+                    # Morte logo depois de subir indica falha de inicialização: espera cresce até 60s
+                    quick = now - started_at[index] < 10
+                    restart_delay[index] = min(restart_delay[index] * 2, 60.0) if quick else 1.0
+                    restart_after[index] = now + restart_delay[index]
+                    logger.error(
+                        "Worker %s saiu com código %s; reiniciando em %.0fs",
+                        index, process.exitcode, restart_delay[index],
+                    )
+                    router.forget_backend(index)
+                    continue
+                restart_after[index] = 0.0
+                start_worker(index)
+
+    async def on_startup(app: web.Application):
+        for index in range(workers):
+            start_worker(index)
+        await router.start()
+        app["supervisor"] = asyncio.ensure_future(supervise())
+
+    async def on_cleanup(app: web.Application):
+        app["supervisor"].cancel()
+        await router.close()
+        for process in processes:
+            if process is not None:
+                process.terminate()
+        for process in processes:
+            if process is not None:
+                process.join(timeout=10)
+        if private_cache_dir is not None:
+            shutil.rmtree(private_cache_dir, ignore_errors=True)
+
+    app = web.Application(client_max_size=16 * 1024 * 1024)
+    app.router.add_get("/metrics", router.metrics)
+    app.router.add_route("*", "/{tail:.*}", router.handle)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    web.run_app(app, host=host, port=port, access_log=None)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Servidor MCP da PokeAPI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers", type=int, default=int(os.environ.get("POKEMCP_WORKERS", 1)),
+        help="processos servindo ferramentas; acima de 1 sobe o roteador com afinidade de sessão,"
+             " que repassa todo o tráfego num único processo",
+    )
+    args = parser.parse_args(argv)
+
+    if args.workers > 1:
+        serve_multiworker(args.workers, args.host, args.port)
+    else:
+        mcp.run(transport="http", host=args.host, port=args.port)
 
 
 if __name__ == "__main__":
-    mcp.run(transport="http")
+    main()
@@ -0,0 +1,55 @@
+import bisect
+from typing import Dict, List, Tuple
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        # Estimativa pelo limite superior do bucket, como o histogram_quantile do Prometheus
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+def prometheus_labels(**labels: str) -> str:
+    escaped = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def render_histograms(
+    name: str, label_names: Tuple[str, ...], histograms: Dict[Tuple[str, ...], LatencyHistogram]
+) -> List[str]:
+    """Linhas de exposição do Prometheus de uma família de histogramas, chaveada pelos valores de label_names"""
+    lines = [f"# TYPE {name} histogram"]
+    for key, histogram in sorted(histograms.items()):
+        labels = dict(zip(label_names, key))
+        cumulative = 0
+        for bound, bucket_count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{name}_bucket{prometheus_labels(**labels, le=le)} {cumulative}")
+        lines.append(f"{name}_sum{prometheus_labels(**labels)} {histogram.sum}")
+        lines.append(f"{name}_count{prometheus_labels(**labels)} {histogram.count}")
+    return lines
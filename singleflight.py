@@ -0,0 +1,41 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+
+class SingleFlight:
+    """
+    Coalesce chamadas concorrentes com a mesma chave numa única execução.
+
+    A primeira chamada de uma chave roda numa task própria que todos esperam
+    via shield: cancelar quem a iniciou não derruba os demais que esperam a
+    mesma chave. Quando a task termina ela sai do mapa e a exceção é marcada
+    como consumida, mesmo que ninguém mais esteja esperando.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._tasks
+
+    def keys(self) -> List[Hashable]:
+        return list(self._tasks)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Marca a exceção como consumida caso ninguém mais esteja esperando
+            task.exception()
+
+    def cancel_all(self):
+        for task in list(self._tasks.values()):
+            task.cancel()